@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class AccountsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'accounts'
+
+    def ready(self):
+        from products.search import connect_sqlite_fts
+        from .search import FTS_TABLE, install_user_fts
+        connect_sqlite_fts(self, FTS_TABLE, install_user_fts)
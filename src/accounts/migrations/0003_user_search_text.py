@@ -0,0 +1,53 @@
+# Generated by Django 5.2.6 on 2026-10-18 12:36
+
+from django.db import migrations, models
+
+from accounts.search import (FTS_TABLE, build_user_search_text, install_user_fts,
+                             postgres_indexes)
+from products.search import uninstall_sqlite_fts
+
+
+def fill_search_text(apps, schema_editor):
+    User = apps.get_model("accounts", "User")
+    rows = list(User.objects.only("id", "first_name", "middle_name", "last_name", "email"))
+    for u in rows:
+        u.search_text = build_user_search_text(u.first_name, u.middle_name, u.last_name, u.email)
+    User.objects.bulk_update(rows, ["search_text"], batch_size=1000)
+
+
+def create_search_indexes(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == "postgresql":
+        User = apps.get_model("accounts", "User")
+        schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        for index in postgres_indexes():
+            schema_editor.add_index(User, index)
+    elif connection.vendor == "sqlite":
+        install_user_fts(connection)
+
+
+def drop_search_indexes(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == "postgresql":
+        User = apps.get_model("accounts", "User")
+        for index in postgres_indexes():
+            schema_editor.remove_index(User, index)
+    elif connection.vendor == "sqlite":
+        uninstall_sqlite_fts(connection, FTS_TABLE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_alter_user_managers'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='search_text',
+            field=models.CharField(blank=True, editable=False, max_length=710),
+        ),
+        migrations.RunPython(fill_search_text, migrations.RunPython.noop),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -1,6 +1,7 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 from .managers import UserManager
+from .search import build_user_search_text
 
 class User(AbstractUser):
     username = None
@@ -9,12 +10,22 @@ class User(AbstractUser):
     middle_name = models.CharField("Отчество", max_length=150, blank=True)
     avatar = models.ImageField("Аватар", upload_to="avatars/", blank=True, null=True)
     bio = models.TextField("О себе", blank=True)
+    # нормализованные «фамилия имя отчество e-mail» для поиска (см. accounts/search.py)
+    search_text = models.CharField(max_length=710, blank=True, editable=False)
 
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = []
 
     objects = UserManager()
 
+    def save(self, *args, **kwargs):
+        self.search_text = build_user_search_text(self.first_name, self.middle_name, self.last_name, self.email)
+        update_fields = kwargs.get("update_fields")
+        # частичное сохранение ФИО или e-mail — индекс поиска пишем вместе с ними
+        if update_fields is not None and {"first_name", "middle_name", "last_name", "email"} & set(update_fields):
+            kwargs["update_fields"] = {*update_fields, "search_text"}
+        super().save(*args, **kwargs)
+
     def full_name(self):
         parts = [self.first_name, self.middle_name, self.last_name]
         return " ".join([p for p in parts if p]).strip()
@@ -0,0 +1,72 @@
+"""
+Поиск пользователей по ФИО и e-mail.
+
+Ищем по User.search_text — нормализованной строке «фамилия имя отчество
+e-mail» (нижний регистр, ё → е), которую заполняет User.save. Индексы — как
+у каталога (products/search.py):
+PostgreSQL: GIN gin_trgm_ops — им ускоряются и подстрока (LIKE), и нечёткое
+совпадение по слову; ранжируем по word_similarity.
+SQLite: FTS5-таблица с триграммным токенайзером и ранг bm25.
+"""
+from django.db import connections
+from django.db.models import FloatField, Q, Value
+
+from products.search import FTS_MIN_LEN, fts_filter, install_sqlite_fts, normalize, tokenize
+
+FTS_TABLE = "accounts_user_fts"
+SOURCE_TABLE = "accounts_user"
+SEARCH_LIMIT = 50
+
+
+def build_user_search_text(first_name, middle_name, last_name, email):
+    return normalize(f"{last_name} {first_name} {middle_name} {email}")
+
+
+def postgres_indexes():
+    from django.contrib.postgres.indexes import GinIndex, OpClass
+    return [GinIndex(OpClass("search_text", name="gin_trgm_ops"), name="user_search_trgm_idx")]
+
+
+def install_user_fts(connection):
+    install_sqlite_fts(connection, FTS_TABLE, SOURCE_TABLE)
+
+
+def search_users(qs, q):
+    """
+    Отфильтровать qs пользователей по запросу q и отсортировать по
+    релевантности (аннотация rank, больше — релевантнее).
+    """
+    q = normalize(q)
+    words = tokenize(q)
+    if not words:
+        return qs.none()
+
+    order = ("-rank", "last_name", "first_name", "id")
+    vendor = connections[qs.db].vendor
+    if vendor == "postgresql":
+        from django.contrib.postgres.search import TrigramWordSimilarity
+
+        return (qs.filter(Q(search_text__contains=q) | Q(search_text__trigram_word_similar=q))
+                  .annotate(rank=TrigramWordSimilarity(q, "search_text"))
+                  .order_by(*order))
+
+    terms = [w for w in words if len(w) >= FTS_MIN_LEN]
+    if vendor == "sqlite" and terms:
+        return fts_filter(qs, terms, FTS_TABLE).order_by(*order)
+    # короткий запрос — с начала любого слова
+    return (qs.filter(Q(search_text__startswith=q) | Q(search_text__contains=f" {q}"))
+              .annotate(rank=Value(0.0, output_field=FloatField()))
+              .order_by(*order))
+
+
+def matching_user_ids(q, among):
+    """
+    id пользователей из among, подходящих под q, — для фильтра ленты по автору.
+    Ищем только среди among (авторов ленты), без общего лимита: иначе
+    подписка, которая не попала в лучшие совпадения по всему сайту, пропала бы.
+    Отдельным запросом, а не подзапросом: extra() для FTS ссылается на
+    таблицу по имени, а во вложенном запросе у неё другой псевдоним.
+    """
+    from .models import User
+
+    return list(search_users(User.objects.filter(pk__in=among), q).values_list("pk", flat=True))
@@ -1,3 +1,20 @@
+from django.contrib.auth import get_user_model
 from django.test import TestCase
 
-# Create your tests here.
+User = get_user_model()
+
+
+class UserSearchTextTests(TestCase):
+    def test_partial_save_refreshes_search_text(self):
+        user = User.objects.create_user(email="fio@example.com", password="p", last_name="Петров")
+        user.last_name = "Сёмин"
+        user.save(update_fields=["last_name"])
+        user.refresh_from_db()
+        self.assertEqual(user.search_text, "семин fio@example.com")
+
+    def test_unrelated_partial_save_leaves_search_text_alone(self):
+        user = User.objects.create_user(email="login@example.com", password="p")
+        User.objects.filter(pk=user.pk).update(search_text="stale")
+        user.save(update_fields=["last_login"])
+        user.refresh_from_db()
+        self.assertEqual(user.search_text, "stale")
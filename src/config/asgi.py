@@ -3,6 +3,31 @@ ASGI config for config project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Запуск под uvicorn (асинхронные view дневника, ленты и каталога обслуживаются
+в цикле событий; их запросы к БД не блокируют цикл, но выполняются по очереди —
+асинхронный ORM отдаёт их в один поток sync_to_async):
+
+    cd src
+    uvicorn config.asgi:application --host 0.0.0.0 --port 8000 --workers 4
+
+- число воркеров — по ядрам, как и для WSGI; один воркер держит сотни
+  медленных клиентов, но синхронные view и рендер шаблонов выполняются в его
+  единственном потоке sync_to_async, так что CPU-работа не параллелится;
+- CONN_MAX_AGE=0 (по умолчанию), при нагрузке — DB_POOL=1 и pip install
+  "psycopg[pool]": соединения берутся из пула на время запроса;
+- кэш — общий (CACHE_BACKEND/CACHE_LOCATION): у каждого воркера свой LocMem;
+- статика — отдельно (nginx / collectstatic), uvicorn её не раздаёт.
+
+Живая лента (/social/feed/live/, Server-Sent Events, social/live.py) работает
+только здесь: открытая вкладка — корутина в цикле воркера, а не поток. Для
+нескольких воркеров — FEED_LIVE_BACKEND=postgres (LISTEN/NOTIFY), иначе
+событие увидят только подписчики, подключённые к тому же воркеру. Прокси —
+без буферизации и с таймаутом чтения больше пинга (20 с).
+
+WSGI-режим (config/wsgi.py) остаётся рабочим: асинхронные view Django
+выполняет и там, через async_to_sync. Сравнить режимы под нагрузкой —
+manage.py bench_http (см. его --help).
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -73,8 +73,25 @@ else:
             "PASSWORD": os.getenv("POSTGRES_PASSWORD", "1638"),
             "HOST": os.getenv("POSTGRES_HOST", "localhost"),
             "PORT": os.getenv("POSTGRES_PORT", "5432"),
+            # под WSGI можно держать соединение между запросами (CONN_MAX_AGE),
+            # под ASGI — только 0: асинхронные view ходят в БД из разных потоков,
+            # и «вечные» соединения копятся. Вместо них — пул psycopg (DB_POOL=1,
+            # нужен пакет psycopg[pool]), см. config/asgi.py.
+            "CONN_MAX_AGE": int(os.getenv("CONN_MAX_AGE", "0")),
+            "OPTIONS": {"pool": True} if os.getenv("DB_POOL", "0") == "1" else {},
         }
     }
+    # lookups trigram_similar / search для поиска по каталогу
+    INSTALLED_APPS.append("django.contrib.postgres")
+
+# Кэш каталога (products/caching.py). LocMem — свой у каждого процесса;
+# при нескольких воркерах укажите общий бэкенд (Redis/Memcached).
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv("CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": os.getenv("CACHE_LOCATION", ""),
+    }
+}
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -101,6 +118,18 @@ STATICFILES_DIRS = [BASE_DIR / "static"]
 STATIC_ROOT = ROOT_DIR / "staticfiles"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = ROOT_DIR / "media"
+# процессы для нарезки миниатюр фото (0 — нарезать сразу в запросе)
+THUMBNAIL_WORKERS = int(os.getenv("THUMBNAIL_WORKERS", "2"))
+# до скольких подписчиков событие раскладывается по лентам прямо в запросе;
+# у авторов популярнее — фоновым потоком (social/inbox.py)
+FEED_FANOUT_INLINE = int(os.getenv("FEED_FANOUT_INLINE", "1000"))
+# записи на одну дату в пределах стольких минут от первой дописываются в одно
+# событие ленты (social/events.py); 0 — укрупняется только внутри одной пачки
+FEED_COALESCE_MINUTES = int(os.getenv("FEED_COALESCE_MINUTES", "60"))
+# живая лента по SSE (social/live.py): local — в пределах процесса,
+# postgres — LISTEN/NOTIFY между воркерами; соединений на процесс не больше
+FEED_LIVE_BACKEND = os.getenv("FEED_LIVE_BACKEND", "local")
+FEED_LIVE_MAX = int(os.getenv("FEED_LIVE_MAX", "5000"))
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -1,13 +1,54 @@
 from django.contrib import admin
+from django.db import transaction
 from .models import Challenge, DiaryEntry
+from .services import entry_added, entry_removed, lock_diary, rebuild_progress
+from social.events import forget_entries, record_entries
 
 @admin.register(Challenge)
 class ChallengeAdmin(admin.ModelAdmin):
-    list_display = ("user", "start_date", "end_date", "target_unique", "is_active")
+    list_display = ("user", "start_date", "end_date", "target_unique", "unique_count", "is_active")
     search_fields = ("user__email",)
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        # сменилось окно челленджа — пересчитываем прогресс
+        if {"start_date", "end_date"} & set(form.changed_data):
+            rebuild_progress(obj.user_id)
+
 @admin.register(DiaryEntry)
 class DiaryEntryAdmin(admin.ModelAdmin):
     list_display = ("user", "date", "product", "amount_grams", "created_at")
     list_filter = ("date",)
-    search_fields = ("user__email", "product__name", "product__kind")
\ No newline at end of file
+    search_fields = ("user__email", "product__name", "product__kind")
+
+    # админка тоже правит записи — держим счётчик прогресса в актуальном виде
+    def save_model(self, request, obj, form, change):
+        with transaction.atomic():
+            lock_diary(obj.user_id)
+            if change:
+                old = DiaryEntry.objects.get(pk=obj.pk)
+            super().save_model(request, obj, form, change)
+            if change:
+                entry_removed(old)
+            entry_added(obj)
+            # продукт или дата сменились — в ленте прежнюю запись заменяет новая
+            if change and (old.product_id, old.date) != (obj.product_id, obj.date):
+                forget_entries([old])
+                record_entries(obj.user_id, [obj])
+
+    def delete_model(self, request, obj):
+        with transaction.atomic():
+            lock_diary(obj.user_id)
+            super().delete_model(request, obj)
+            entry_removed(obj)
+            forget_entries([obj])
+
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            removed = list(queryset)
+            for user_id in sorted({e.user_id for e in removed}):
+                lock_diary(user_id)
+            super().delete_queryset(request, queryset)
+            for entry in removed:
+                entry_removed(entry)
+            forget_entries(removed)
@@ -1,10 +1,8 @@
-from .services import get_progress
+from .services import request_progress
 
 def progress_helpers(request):
-    progress = None
-    if request.user.is_authenticated:
-        try:
-            progress = get_progress(request.user)
-        except Exception:
-            progress = None
-    return {"progress": progress}
\ No newline at end of file
+    try:
+        progress = request_progress(request)
+    except Exception:
+        progress = None
+    return {"progress": progress}
@@ -0,0 +1,88 @@
+"""
+Выгрузка дневника с нутриентами продуктов в CSV и NDJSON.
+
+Строки читаются курсором на стороне сервера (.iterator(chunk_size=…)) и
+сразу пишутся в поток, поэтому память не зависит от длины истории: в
+процессе держится одна пачка строк. Используется и в ответе
+StreamingHttpResponse (views.export_entries), и в команде export_diary.
+
+Под ASGI синхронный итератор StreamingHttpResponse целиком собирает в
+список, поэтому там ответ получает aexport_lines: тот же генератор,
+который читается пачками через sync_to_async.
+"""
+import csv
+import itertools
+import json
+
+from asgiref.sync import sync_to_async
+
+from .models import DiaryEntry
+
+CHUNK_SIZE = 2000
+FIELDS = (
+    "date", "product_id", "product", "kind", "amount_grams", "note",
+    "kcal", "proteins", "fats", "carbs", "created_at",
+)
+COLUMNS = (
+    "date", "product_id", "product__name", "product__kind", "amount_grams", "note",
+    "product__kcal", "product__proteins", "product__fats", "product__carbs", "created_at",
+)
+FORMATS = {
+    # формат → (MIME, расширение)
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+}
+
+
+def entry_rows(qs, with_user=False):
+    """Кортежи строк выгрузки в порядке (пользователь, дата); поля — FIELDS (+ user_id первым)."""
+    columns = ("user_id", *COLUMNS) if with_user else COLUMNS
+    return (qs.order_by("user_id", "date", "id")
+            .values_list(*columns)
+            .iterator(chunk_size=CHUNK_SIZE))
+
+
+def _plain(value):
+    # Decimal — строкой без потери точности, даты — в ISO
+    if value is None or isinstance(value, (int, str)):
+        return value
+    return value.isoformat() if hasattr(value, "isoformat") else str(value)
+
+
+class _Echo:
+    """Файлоподобный объект для csv.writer: отдаёт строку, а не копит её."""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows, with_user=False):
+    writer = csv.writer(_Echo())
+    yield "\ufeff" + writer.writerow(("user_id", *FIELDS) if with_user else FIELDS)  # BOM — для Excel
+    for row in rows:
+        yield writer.writerow([_plain(v) for v in row])
+
+
+def ndjson_lines(rows, with_user=False):
+    fields = ("user_id", *FIELDS) if with_user else FIELDS
+    for row in rows:
+        yield json.dumps(dict(zip(fields, map(_plain, row))), ensure_ascii=False) + "\n"
+
+
+def export_lines(fmt, qs=None, with_user=False):
+    """Генератор строк выгрузки в формате fmt ("csv" / "ndjson")."""
+    rows = entry_rows(DiaryEntry.objects.all() if qs is None else qs, with_user)
+    lines = csv_lines if fmt == "csv" else ndjson_lines
+    return lines(rows, with_user)
+
+
+async def aexport_lines(fmt, qs=None, with_user=False):
+    """То же, что export_lines, асинхронным итератором: по пачке из CHUNK_SIZE строк."""
+    lines = export_lines(fmt, qs, with_user)
+    # курсор БД живёт в потоке запроса — и читаем, и закрываем его там же
+    take = sync_to_async(lambda: "".join(itertools.islice(lines, CHUNK_SIZE)))
+    try:
+        while chunk := await take():
+            yield chunk
+    finally:
+        await sync_to_async(lines.close)()
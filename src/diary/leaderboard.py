@@ -0,0 +1,75 @@
+"""
+Рейтинг челленджа по числу уникальных продуктов.
+
+Счёт — Challenge.unique_count, его ведут services.entries_added /
+entry_removed; они же сдвигают гистограмму ScoreBucket (move_score)
+в той же транзакции. Отсюда:
+  * топ-N — проход по индексу challenge_leaderboard_idx;
+  * место пользователя — сумма по ScoreBucket выше его счёта;
+  * рейтинг среди подписок — выборка нескольких челленджей по user_id.
+Места «спортивные»: при равном счёте место общее (1, 2, 2, 4).
+"""
+from django.db.models import Count, F, Sum
+
+from .models import Challenge, ScoreBucket
+
+TOP = 50
+
+
+def move_score(old, new):
+    """Челлендж перешёл со счёта old на new (None — появился или исчез)."""
+    if old == new:
+        return
+    if new is not None:
+        # INSERT … ON CONFLICT DO NOTHING: существующую строку не блокирует
+        ScoreBucket.objects.bulk_create([ScoreBucket(score=new)], ignore_conflicts=True)
+    deltas = {score: delta for score, delta in ((old, -1), (new, 1)) if score is not None}
+    # строки блокируем по возрастанию счёта: встречные 5→6 и 6→5 иначе
+    # захватили бы их в разном порядке и упёрлись бы в deadlock
+    for score in sorted(deltas):
+        ScoreBucket.objects.filter(score=score).update(users=F("users") + deltas[score])
+
+
+def rank_of(score):
+    above = ScoreBucket.objects.filter(score__gt=score).aggregate(n=Sum("users"))["n"]
+    return (above or 0) + 1
+
+
+def total_users():
+    return ScoreBucket.objects.aggregate(n=Sum("users"))["n"] or 0
+
+
+def top(n=TOP):
+    """[(место, user, счёт)] — первые n по индексу."""
+    rows = list(Challenge.objects.select_related("user").order_by("-unique_count", "user_id")[:n])
+    return _ranked(rows, first_rank=1)
+
+
+def among(user_ids):
+    """[(место, user, счёт)] среди данных пользователей (подписки и я)."""
+    rows = list(Challenge.objects.filter(user_id__in=user_ids).select_related("user")
+                .order_by("-unique_count", "user_id"))
+    return _ranked(rows, first_rank=1)
+
+
+def _ranked(rows, first_rank):
+    out, rank, prev = [], first_rank, None
+    for i, ch in enumerate(rows):
+        if ch.unique_count != prev:
+            rank, prev = first_rank + i, ch.unique_count
+        out.append((rank, ch.user, ch.unique_count))
+    return out
+
+
+def rebuild_buckets(fix=True):
+    """Сверить гистограмму с челленджами; вернёт число расходящихся счётов."""
+    expected = {
+        score: n for score, n in
+        Challenge.objects.values_list("unique_count").annotate(n=Count("id")).order_by()
+    }
+    actual = {s: n for s, n in ScoreBucket.objects.filter(users__gt=0).values_list("score", "users")}
+    broken = sum(1 for s in expected.keys() | actual.keys() if expected.get(s) != actual.get(s))
+    if fix and broken:
+        ScoreBucket.objects.all().delete()
+        ScoreBucket.objects.bulk_create([ScoreBucket(score=s, users=n) for s, n in expected.items()])
+    return broken
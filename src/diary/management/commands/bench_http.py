@@ -0,0 +1,115 @@
+import http.client
+import statistics
+import threading
+import time
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+
+from diary.services import ensure_challenge_for
+
+User = get_user_model()
+
+PATHS = ["/diary/", "/diary/month/", "/social/feed/", "/products/"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Нагрузочный замер запущенного сервера: N потоков с keep-alive по очереди "
+        "запрашивают страницы от имени пользователя. Один и тот же прогон против "
+        "gunicorn (config.wsgi) и uvicorn (config.asgi) сравнивает режимы."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", default="http://127.0.0.1:8000")
+        parser.add_argument("--paths", nargs="+", default=PATHS)
+        parser.add_argument("--concurrency", default="1,8,32,64",
+                            help="Уровни параллелизма через запятую")
+        parser.add_argument("--requests", type=int, default=2000, help="Запросов на уровень")
+        parser.add_argument("--user", default="bench@example.com",
+                            help="Email пользователя; создаётся, если его нет")
+
+    def handle(self, *args, **options):
+        url = urlsplit(options["url"])
+        self.host, self.port = url.hostname, url.port or 80
+        self.paths = options["paths"]
+        self.cookie = self._session_cookie(options["user"])
+        levels = [int(c) for c in options["concurrency"].split(",") if c.strip()]
+
+        self.stdout.write(f"{'потоков':>8} {'запр/с':>9} {'p50, мс':>9} {'p95, мс':>9} "
+                          f"{'p99, мс':>9} {'ошибок':>7}")
+        for level in levels:
+            rps, samples, errors = self._run(level, options["requests"])
+            q = statistics.quantiles(samples, n=100) if len(samples) > 1 else samples * 99
+            self.stdout.write(f"{level:>8} {rps:>9.0f} {q[49]:>9.1f} {q[94]:>9.1f} "
+                              f"{q[98]:>9.1f} {errors:>7}")
+
+    def _session_cookie(self, email):
+        user = User.objects.filter(email=email).first()
+        if user is None:
+            user = User.objects.create_user(email=email, password=None)
+        ensure_challenge_for(user)
+        # сессия в общей БД — сервер примет её как обычный вход
+        client = Client()
+        client.force_login(user)
+        name = settings.SESSION_COOKIE_NAME
+        return f"{name}={client.cookies[name].value}"
+
+    def _request(self, path, conn=None):
+        own = conn is None
+        conn = conn or http.client.HTTPConnection(self.host, self.port, timeout=30)
+        try:
+            conn.request("GET", path, headers={"Cookie": self.cookie, "Host": self.host})
+            response = conn.getresponse()
+            response.read()
+            return response.status
+        finally:
+            if own:
+                conn.close()
+
+    def _run(self, level, total):
+        if not self._check():  # заодно прогрев кэшей
+            raise CommandError(f"Сервер {self.host}:{self.port} не отвечает 200 на {self.paths[0]}")
+        lock = threading.Lock()
+        counter = iter(range(total))
+        samples, errors = [], [0]
+
+        def worker():
+            conn = http.client.HTTPConnection(self.host, self.port, timeout=30)
+            local, failed = [], 0
+            while True:
+                with lock:
+                    i = next(counter, None)
+                if i is None:
+                    break
+                started = time.perf_counter()
+                try:
+                    status = self._request(self.paths[i % len(self.paths)], conn)
+                except (OSError, http.client.HTTPException):
+                    conn.close()
+                    conn = http.client.HTTPConnection(self.host, self.port, timeout=30)
+                    status = None
+                if status != 200:
+                    failed += 1
+                local.append((time.perf_counter() - started) * 1000)
+            conn.close()
+            with lock:
+                samples.extend(local)
+                errors[0] += failed
+
+        threads = [threading.Thread(target=worker) for _ in range(level)]
+        started = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return total / (time.perf_counter() - started), samples, errors[0]
+
+    def _check(self):
+        try:
+            return self._request(self.paths[0]) == 200
+        except OSError:
+            return False
@@ -0,0 +1,80 @@
+import datetime
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.db.models import Count, Max, Min
+
+from diary import leaderboard
+from diary.models import Challenge
+from products.bench import BenchCommand
+
+User = get_user_model()
+
+
+class Command(BenchCommand):
+    help = (
+        "Замеры рейтинга челленджа на сгенерированных пользователях. "
+        "Всё выполняется в транзакции, которая в конце откатывается."
+    )
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument("--users", type=int, default=100_000)
+
+    def _seed(self, **options):
+        n = options["users"]
+        started = time.monotonic()
+        start = datetime.date.today()
+        batch = 5000
+        for first in range(0, n, batch):
+            users = User.objects.bulk_create([
+                User(email=f"bench-{i}@example.invalid", password="!")
+                for i in range(first, min(first + batch, n))
+            ])
+            if users[0].pk is None:
+                users = list(User.objects.filter(email__startswith="bench-").order_by("-pk")[:len(users)])
+            Challenge.objects.bulk_create([
+                # правдоподобный «хвост»: большинство в начале пути, единицы — у цели
+                Challenge(user_id=u.pk, start_date=start, end_date=start + datetime.timedelta(days=365),
+                          unique_count=min(400, int(random.expovariate(1 / 60))))
+                for u in users
+            ])
+        # bulk_create без сигналов — гистограмму строим целиком
+        leaderboard.rebuild_buckets()
+        self._analyze()
+        self.stdout.write(f"Сгенерировано {n} пользователей за {time.monotonic() - started:.1f} с "
+                          f"({connection.vendor}).")
+
+    def _run(self):
+        bounds = Challenge.objects.aggregate(low=Min("unique_count"), high=Max("unique_count"))
+        low, high = bounds["low"], bounds["high"]
+        some = random.sample(list(Challenge.objects.values_list("user_id", flat=True)), 200)
+
+        # запись: +1 уникальный продукт у одного участника
+        ch = Challenge.objects.order_by("?").first()
+
+        def bump():
+            with transaction.atomic():
+                Challenge.objects.filter(pk=ch.pk).update(unique_count=ch.unique_count + 1)
+                leaderboard.move_score(ch.unique_count, ch.unique_count + 1)
+                Challenge.objects.filter(pk=ch.pk).update(unique_count=ch.unique_count)
+                leaderboard.move_score(ch.unique_count + 1, ch.unique_count)
+
+        scenarios = [
+            ("топ-50", lambda: leaderboard.top()),
+            (f"место, счёт {low} (низ)", lambda: leaderboard.rank_of(low)),
+            (f"место, счёт {high} (верх)", lambda: leaderboard.rank_of(high)),
+            (f"место через COUNT, счёт {low} (как без гистограммы)",
+             lambda: Challenge.objects.filter(unique_count__gt=low).count()),
+            ("среди 200 подписок", lambda: leaderboard.among(some)),
+            ("полный GROUP BY по счётам", lambda: list(
+                Challenge.objects.values("unique_count").annotate(n=Count("id")).order_by())),
+            ("обновление рейтинга (+1 и обратно)", bump),
+        ]
+        self._scenarios(scenarios)
+        self._plans([
+            ("топ-50", Challenge.objects.order_by("-unique_count", "user_id")[:50]),
+            ("место", leaderboard.ScoreBucket.objects.filter(score__gt=low)),
+        ])
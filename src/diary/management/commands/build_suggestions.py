@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from diary.suggestions import CHUNK, K, NEIGHBOURS, build_suggestions
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересчитывает подсказки «что ещё не пробовал» (Suggestion) по совместной "
+        "встречаемости продуктов в дневниках. Запускать по расписанию, например раз в сутки."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--k", type=int, default=K, help="Подсказок на пользователя")
+        parser.add_argument("--neighbours", type=int, default=NEIGHBOURS,
+                            help="Сколько похожих продуктов хранить для каждого продукта")
+        parser.add_argument("--chunk", type=int, default=CHUNK, help="Пользователей в пачке")
+
+    def handle(self, *args, **options):
+        stats = build_suggestions(
+            k=max(1, options["k"]),
+            neighbours=max(1, options["neighbours"]),
+            chunk=max(1, options["chunk"]),
+            log=lambda msg: self.stderr.write(msg),
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Готово за {stats['seconds']:.1f} с: пользователей {stats['users']}, "
+            f"продуктов {stats['products']}, подсказок {stats['suggestions']}."
+        ))
@@ -0,0 +1,45 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from diary.leaderboard import rebuild_buckets
+from diary.services import rebuild_progress
+
+
+class Command(BaseCommand):
+    help = (
+        "Сверяет денормализованные данные дневника (FirstEaten, Challenge.unique_count, "
+        "DailyStats, ScoreBucket) с записями и пересобирает расходящиеся."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--verify", action="store_true",
+                            help="Только проверить; код возврата 1, если есть расхождения")
+        parser.add_argument("--user", type=int, help="id пользователя")
+
+    def handle(self, *args, **options):
+        fix = not options["verify"]
+        users = get_user_model().objects.order_by("pk")
+        if options["user"] is not None:
+            users = users.filter(pk=options["user"])
+
+        checked = broken = 0
+        for pk, email in users.values_list("pk", "email").iterator(chunk_size=1000):
+            checked += 1
+            mismatches = rebuild_progress(pk, fix=fix)
+            if mismatches:
+                broken += 1
+                self.stderr.write(self.style.WARNING(
+                    f"{email}: расхождений {mismatches}" + (" — пересобрано" if fix else "")
+                ))
+
+        self.stdout.write(f"Проверено пользователей: {checked}, с расхождениями: {broken}.")
+        if options["user"] is None:
+            # гистограмма рейтинга — после счётчиков, из которых она строится
+            buckets = rebuild_buckets(fix=fix)
+            if buckets:
+                broken += 1
+                self.stderr.write(self.style.WARNING(
+                    f"Рейтинг: расходящихся счётов {buckets}" + (" — пересобрано" if fix else "")
+                ))
+        if broken and not fix:
+            raise CommandError("Данные прогресса расходятся с дневником.")
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.6 on 2026-10-18 12:03
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def fill_counters(apps, schema_editor):
+    Challenge = apps.get_model("diary", "Challenge")
+    DiaryEntry = apps.get_model("diary", "DiaryEntry")
+    FirstEaten = apps.get_model("diary", "FirstEaten")
+    for ch in Challenge.objects.all().iterator():
+        firsts = (DiaryEntry.objects
+                  .filter(user_id=ch.user_id, date__gte=ch.start_date, date__lte=ch.end_date)
+                  .values_list("product_id")
+                  .annotate(first=Min("date")))
+        rows = [FirstEaten(user_id=ch.user_id, product_id=pk, first_date=first) for pk, first in firsts]
+        FirstEaten.objects.bulk_create(rows, batch_size=1000)
+        Challenge.objects.filter(pk=ch.pk).update(unique_count=len(rows))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('diary', '0001_initial'),
+        ('products', '0007_product_updated_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='challenge',
+            name='unique_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.CreateModel(
+            name='FirstEaten',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('first_date', models.DateField()),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='products.product')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='first_eaten', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'product'), name='uniq_first_eaten_user_product')],
+            },
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
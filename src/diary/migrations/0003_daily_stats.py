@@ -0,0 +1,52 @@
+# Generated by Django 5.2.6 on 2026-10-18 12:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def fill_daily_stats(apps, schema_editor):
+    DiaryEntry = apps.get_model("diary", "DiaryEntry")
+    FirstEaten = apps.get_model("diary", "FirstEaten")
+    DailyStats = apps.get_model("diary", "DailyStats")
+    new = dict(
+        ((user_id, d), n)
+        for user_id, d, n in FirstEaten.objects.values_list("user_id", "first_date").annotate(n=Count("id"))
+    )
+    days = (DiaryEntry.objects
+            .values_list("user_id", "date")
+            .annotate(n=Count("id"), grams=Sum("amount_grams"))
+            .order_by())
+    DailyStats.objects.bulk_create(
+        (DailyStats(user_id=user_id, date=d, entries=n, grams=grams or 0,
+                    new_products=new.get((user_id, d), 0))
+         for user_id, d, n, grams in days.iterator()),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('diary', '0002_progress_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('entries', models.PositiveIntegerField(default=0)),
+                ('new_products', models.PositiveIntegerField(default=0)),
+                ('grams', models.PositiveIntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'date'), name='uniq_daily_stats_user_date')],
+            },
+        ),
+        migrations.RunPython(fill_daily_stats, migrations.RunPython.noop),
+    ]
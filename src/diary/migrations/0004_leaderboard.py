@@ -0,0 +1,37 @@
+# Generated by Django 5.2.6 on 2026-10-18 12:09
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_buckets(apps, schema_editor):
+    Challenge = apps.get_model("diary", "Challenge")
+    ScoreBucket = apps.get_model("diary", "ScoreBucket")
+    ScoreBucket.objects.bulk_create([
+        ScoreBucket(score=score, users=n)
+        for score, n in Challenge.objects.values_list("unique_count").annotate(n=Count("id")).order_by()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('diary', '0003_daily_stats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScoreBucket',
+            fields=[
+                ('score', models.PositiveIntegerField(primary_key=True, serialize=False)),
+                ('users', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='challenge',
+            index=models.Index(fields=['-unique_count', 'user'], name='challenge_leaderboard_idx'),
+        ),
+        migrations.RunPython(fill_buckets, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.2.6 on 2026-10-18 12:12
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_changes(apps, schema_editor):
+    Challenge = apps.get_model("diary", "Challenge")
+    DiaryEntry = apps.get_model("diary", "DiaryEntry")
+    EntryChange = apps.get_model("diary", "EntryChange")
+    for ch in Challenge.objects.all().iterator():
+        keys = (DiaryEntry.objects.filter(user_id=ch.user_id)
+                .order_by("created_at", "id")
+                .values_list("product_id", "date"))
+        rows = [EntryChange(user_id=ch.user_id, product_id=pk, date=d, seq=i)
+                for i, (pk, d) in enumerate(keys, start=1)]
+        EntryChange.objects.bulk_create(rows, batch_size=1000)
+        Challenge.objects.filter(pk=ch.pk).update(sync_seq=len(rows))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('diary', '0004_leaderboard'),
+        ('products', '0007_product_updated_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='challenge',
+            name='sync_seq',
+            field=models.PositiveBigIntegerField(default=0, editable=False),
+        ),
+        migrations.CreateModel(
+            name='EntryChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('seq', models.PositiveBigIntegerField()),
+                ('deleted', models.BooleanField(default=False)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='products.product')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'seq'], name='entry_change_user_seq_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'product', 'date'), name='uniq_entry_change_key')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SyncRequest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64)),
+                ('response', models.JSONField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['created_at'], name='diary_syncr_created_8c0128_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'key'), name='uniq_sync_request_key')],
+            },
+        ),
+        migrations.RunPython(fill_changes, migrations.RunPython.noop),
+    ]
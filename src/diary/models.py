@@ -9,6 +9,17 @@ class Challenge(models.Model):
     end_date = models.DateField()  # установим при создании (start_date + 365)
     target_unique = models.PositiveIntegerField(default=400)
     is_active = models.BooleanField(default=True)
+    # сколько разных продуктов съедено в окне челленджа (= строк FirstEaten пользователя);
+    # ведётся в services.entry_added / entry_removed, сверка — manage.py rebuild_progress
+    unique_count = models.PositiveIntegerField(default=0, editable=False)
+    # последний номер изменения дневника (EntryChange.seq) — курсор синхронизации
+    sync_seq = models.PositiveBigIntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            # топ рейтинга — проход по индексу с начала
+            models.Index(fields=["-unique_count", "user"], name="challenge_leaderboard_idx"),
+        ]
 
     def __str__(self):
         return f"Челлендж {self.user.email} {self.start_date}–{self.end_date}"
@@ -32,4 +43,119 @@ class DiaryEntry(models.Model):
         ]
 
     def __str__(self):
-        return f"{self.user.email} — {self.product} — {self.date}"
\ No newline at end of file
+        return f"{self.user.email} — {self.product} — {self.date}"
+
+class FirstEaten(models.Model):
+    """
+    Продукт, впервые съеденный в окне челленджа: одна строка на (пользователь, продукт)
+    с датой самой ранней записи. Денормализация DiaryEntry ради счётчика прогресса.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="first_eaten")
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="+")
+    first_date = models.DateField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "product"], name="uniq_first_eaten_user_product")
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} — {self.product_id} — {self.first_date}"
+
+
+class DailyStats(models.Model):
+    """
+    Итоги дня пользователя: записи, впервые съеденные продукты, граммы.
+    Ведётся вместе с FirstEaten (services.entry_added / entry_removed);
+    календарь и годовая карта читают её одним диапазоном по (user, date).
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="daily_stats")
+    date = models.DateField()
+    entries = models.PositiveIntegerField(default=0)
+    new_products = models.PositiveIntegerField(default=0)
+    grams = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "date"], name="uniq_daily_stats_user_date")
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} — {self.date}: {self.entries}"
+
+
+class ScoreBucket(models.Model):
+    """
+    Гистограмма рейтинга: сколько челленджей набрали ровно score уникальных продуктов.
+    Место = 1 + сумма users по score выше своего — короткий проход по первичному
+    ключу (различных счётов сотни), без подсчёта по всем челленджам. См. leaderboard.py.
+    """
+    score = models.PositiveIntegerField(primary_key=True)
+    users = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.score}: {self.users}"
+
+
+class EntryChange(models.Model):
+    """
+    Последнее изменение записи дневника для синхронизации клиентов. Запись
+    определяется естественным ключом (user, product, date); при каждом
+    добавлении/удалении строка получает новый seq из Challenge.sync_seq.
+    deleted=True — «надгробие»: клиент должен удалить запись у себя.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="+")
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="+")
+    date = models.DateField()
+    seq = models.PositiveBigIntegerField()
+    deleted = models.BooleanField(default=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "product", "date"], name="uniq_entry_change_key")
+        ]
+        indexes = [
+            models.Index(fields=["user", "seq"], name="entry_change_user_seq_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} — {self.product_id} — {self.date} #{self.seq}"
+
+
+class SyncRequest(models.Model):
+    """Ответ на загрузку с ключом идемпотентности: повтор запроса вернёт его же."""
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="+")
+    key = models.CharField(max_length=64)
+    response = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "key"], name="uniq_sync_request_key")
+        ]
+        indexes = [
+            models.Index(fields=["created_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} — {self.key}"
+
+
+class Suggestion(models.Model):
+    """
+    Что попробовать: top-K продуктов для пользователя по совместной встречаемости
+    в дневниках. Таблицу целиком пересобирает manage.py build_suggestions
+    (см. suggestions.py); съеденное с тех пор отсекается при чтении по FirstEaten.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="+")
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="+")
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "rank"], name="uniq_suggestion_user_rank")
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} — {self.product_id} #{self.rank}"
@@ -0,0 +1,91 @@
+"""
+Сколько съедено: ккал и БЖУ за день, неделю или весь челлендж.
+
+Считает база — SUM(amount_grams * нутриент / 100) с группировкой по дате,
+одним запросом на период, без обхода записей в Python. Записи без граммов
+в сумму не входят (их считаем отдельно — "unweighed").
+
+Итоги кэшируются на (пользователь, период). В ключе две версии: дневника
+пользователя (сдвигается при записи в дневник, см. bump_diary_version) и
+каталога (products/caching.py) — нутриенты продукта тоже могут поменяться.
+"""
+import datetime
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Q, Sum
+
+from products.caching import bump_version, catalog_version, get_version
+from products.models import NUTRIENTS
+
+from .models import DiaryEntry
+
+PERIODS = ("day", "week", "challenge")
+TIMEOUT = 60 * 60
+ZERO = Decimal("0.00")
+
+
+def _version_key(user_id):
+    return f"diary:version:{user_id}"
+
+
+def diary_version(user_id):
+    return get_version(_version_key(user_id))
+
+
+def bump_diary_version(user_id):
+    """Сбросить кэш итогов пользователя после коммита текущей транзакции."""
+    bump_version(_version_key(user_id))
+
+
+def period_bounds(user, period, date):
+    """(начало, конец) периода, в который попадает date."""
+    if period == "week":
+        start = date - datetime.timedelta(days=date.weekday())
+        return start, start + datetime.timedelta(days=6)
+    if period == "challenge":
+        ch = getattr(user, "challenge", None)
+        if ch:
+            return ch.start_date, ch.end_date
+    return date, date
+
+
+def _intake(nutrient):
+    return Sum(ExpressionWrapper(
+        F("amount_grams") * F(f"product__{nutrient}") / 100,
+        output_field=DecimalField(max_digits=14, decimal_places=2),
+    ))
+
+
+def _compute(user_id, start, end):
+    rows = (DiaryEntry.objects
+            .filter(user_id=user_id, date__gte=start, date__lte=end)
+            .values("date")
+            .annotate(entries=Count("id"), grams=Sum("amount_grams"),
+                      unweighed=Count("id", filter=Q(amount_grams__isnull=True)),
+                      **{n: _intake(n) for n in NUTRIENTS})
+            .order_by("date"))
+    days = []
+    for row in rows:
+        row["grams"] = row["grams"] or 0
+        for n in NUTRIENTS:
+            row[n] = (row[n] or ZERO).quantize(ZERO)
+        days.append(row)
+    totals = {"entries": sum(d["entries"] for d in days), "grams": sum(d["grams"] for d in days),
+              "unweighed": sum(d["unweighed"] for d in days),
+              **{n: sum((d[n] for d in days), ZERO) for n in NUTRIENTS}}
+    return {"start": start, "end": end, "days": days, "totals": totals}
+
+
+def nutrition_summary(user, period="day", date=None):
+    """
+    {"start", "end", "days": [{date, entries, grams, unweighed, kcal, proteins, fats, carbs}],
+     "totals": {…те же суммы…}} — из кэша или одним агрегирующим запросом.
+    """
+    start, end = period_bounds(user, period, date or datetime.date.today())
+    key = f"diary:nutrition:{user.pk}:{diary_version(user.pk)}:{catalog_version()}:{start}:{end}"
+    value = cache.get(key)
+    if value is None:
+        value = _compute(user.pk, start, end)
+        cache.set(key, value, TIMEOUT)
+    return value
@@ -1,6 +1,10 @@
 import datetime
-from django.db.models import Count
-from .models import Challenge, DiaryEntry
+from collections import defaultdict
+from django.db import transaction
+from django.db.models import Count, F, Min, Sum
+from .models import Challenge, DailyStats, DiaryEntry, EntryChange, FirstEaten
+from .leaderboard import move_score
+from .nutrition import bump_diary_version
 
 def ensure_challenge_for(user):
     """Создать челлендж, если его ещё нет."""
@@ -8,20 +12,24 @@ def ensure_challenge_for(user):
     if ch is None:
         start = datetime.date.today()
         ch = Challenge.objects.create(user=user, start_date=start, end_date=start + datetime.timedelta(days=365))
+        # записи в окне могли появиться раньше челленджа (например, из админки)
+        rebuild_progress(user.pk)
     return ch
 
 def get_progress(user):
     """Вернёт (unique_count, target, days_elapsed, days_total) по активному челленджу"""
-    ch = getattr(user, "challenge", None)
+    return progress_from(getattr(user, "challenge", None))
+
+async def aget_progress(user):
+    """То же для асинхронных view — через асинхронный ORM."""
+    return progress_from(await Challenge.objects.filter(user_id=user.pk).afirst())
+
+def progress_from(ch):
     if not ch:
         return (0, 400, 0, 365)
 
-    # Сколько уникальных продуктов за окно челленджа
-    qs = (DiaryEntry.objects
-          .filter(user=user, date__gte=ch.start_date, date__lte=ch.end_date)
-          .values("product")  # уникальные продукт-объекты (учитывают сорт)
-          .distinct())
-    unique_count = qs.count()
+    # Сколько уникальных продуктов за окно челленджа — готовый счётчик, без COUNT DISTINCT
+    unique_count = ch.unique_count
 
     # Сколько дней прошло с начала (не больше 365)
     today = datetime.date.today()
@@ -29,3 +37,196 @@ def get_progress(user):
     days_total = (ch.end_date - ch.start_date).days + 1
 
     return (unique_count, ch.target_unique, days_elapsed, days_total)
+
+def request_progress(request):
+    """
+    Прогресс для текущего запроса — считается один раз (его же берёт
+    контекст-процессор). Асинхронные view кладут request.diary_progress заранее.
+    """
+    if not hasattr(request, "diary_progress"):
+        request.diary_progress = get_progress(request.user) if request.user.is_authenticated else None
+    return request.diary_progress
+
+async def request_user(request):
+    """
+    Пользователь для асинхронного view. request.auser() и request.user кэшируют
+    его раздельно — подставляем готовый объект, чтобы рендер в потоке
+    (шаблоны, контекст-процессоры) не читал сессию и пользователя ещё раз.
+    """
+    user = await request.auser()
+    request.user = user
+    return user
+
+
+# --- счётчик уникальных продуктов и дневная статистика ---
+# Вызывать в той же транзакции, что и изменение DiaryEntry. Строка челленджа
+# блокируется (select_for_update), поэтому параллельные добавления и удаления
+# одного пользователя проходят по очереди и счётчик не расходится с FirstEaten.
+
+def lock_diary(user_id):
+    """
+    Заблокировать челлендж пользователя до конца транзакции. Вызывать до
+    вставки/удаления записей: иначе две транзакции могут ждать друг друга
+    (одна — на уникальном индексе записи, другая — на строке челленджа).
+    """
+    return Challenge.objects.select_for_update().filter(user_id=user_id).first()
+
+def _bump_day(user_id, date, entries=0, new=0, grams=0):
+    """Сдвинуть счётчики дня; пустой день удаляется."""
+    DailyStats.objects.get_or_create(user_id=user_id, date=date)
+    day = DailyStats.objects.filter(user_id=user_id, date=date)
+    day.update(entries=F("entries") + entries, new_products=F("new_products") + new, grams=F("grams") + grams)
+    if entries < 0:
+        day.filter(entries__lte=0).delete()
+
+def _move_first(user_id, old, new):
+    """Дата первого знакомства с продуктом сменилась: old → new (любая может быть None)."""
+    if old == new:
+        return
+    if old is not None:
+        _bump_day(user_id, old, new=-1)
+    if new is not None:
+        _bump_day(user_id, new, new=1)
+
+def _log_changes(ch, keys, deleted):
+    """
+    Отметить изменение записей [(product_id, date)] для синхронизации. Номера
+    выдаёт счётчик челленджа под его блокировкой — у пользователя они идут
+    в порядке коммитов, и клиент с курсором ничего не пропустит.
+    """
+    if not keys:
+        return
+    Challenge.objects.filter(pk=ch.pk).update(sync_seq=F("sync_seq") + len(keys))
+    EntryChange.objects.bulk_create(
+        [EntryChange(user_id=ch.user_id, product_id=pk, date=d, seq=ch.sync_seq + i, deleted=deleted)
+         for i, (pk, d) in enumerate(keys, start=1)],
+        update_conflicts=True,
+        unique_fields=["user", "product", "date"],
+        update_fields=["seq", "deleted"],
+    )
+    ch.sync_seq += len(keys)
+
+def entries_added(entries):
+    """Учесть новые записи одного пользователя (пачкой) в дневной статистике, FirstEaten и счётчике."""
+    if not entries:
+        return
+    user_id = entries[0].user_id
+    ch = lock_diary(user_id)
+    days = defaultdict(lambda: [0, 0, 0])  # дата → [записей, новых продуктов, граммов]
+    for e in entries:
+        days[e.date][0] += 1
+        days[e.date][2] += e.amount_grams or 0
+
+    if ch is not None:
+        firsts = {}
+        for e in entries:
+            if ch.start_date <= e.date <= ch.end_date:
+                firsts[e.product_id] = min(e.date, firsts.get(e.product_id, e.date))
+        existing = dict(FirstEaten.objects
+                        .filter(user_id=user_id, product_id__in=firsts)
+                        .values_list("product_id", "first_date"))
+        created = [FirstEaten(user_id=user_id, product_id=pk, first_date=d)
+                   for pk, d in firsts.items() if pk not in existing]
+        FirstEaten.objects.bulk_create(created)
+        for pk, d in firsts.items():
+            old = existing.get(pk)
+            if old is None:
+                days[d][1] += 1
+            elif d < old:
+                FirstEaten.objects.filter(user_id=user_id, product_id=pk).update(first_date=d)
+                days[old][1] -= 1
+                days[d][1] += 1
+        if created:
+            Challenge.objects.filter(pk=ch.pk).update(unique_count=F("unique_count") + len(created))
+            move_score(ch.unique_count, ch.unique_count + len(created))
+        _log_changes(ch, [(e.product_id, e.date) for e in entries], deleted=False)
+
+    for d, (n, new, grams) in days.items():
+        _bump_day(user_id, d, entries=n, new=new, grams=grams)
+    bump_diary_version(user_id)
+
+def entry_added(entry):
+    """Учесть новую запись дневника."""
+    entries_added([entry])
+
+def entry_removed(entry):
+    """Учесть удаление записи (вызывать после delete(), поля объекта ещё на месте)."""
+    user_id, product_id = entry.user_id, entry.product_id
+    ch = lock_diary(user_id)
+    if ch is not None:
+        _log_changes(ch, [(product_id, entry.date)], deleted=True)
+    if ch is not None and ch.start_date <= entry.date <= ch.end_date:
+        # индекс (user, product): записей продукта у пользователя единицы
+        first = (DiaryEntry.objects
+                 .filter(user_id=user_id, product_id=product_id, date__gte=ch.start_date, date__lte=ch.end_date)
+                 .aggregate(first=Min("date"))["first"])
+        rows = FirstEaten.objects.filter(user_id=user_id, product_id=product_id)
+        old = rows.values_list("first_date", flat=True).first()
+        if first is not None:
+            rows.update(first_date=first)
+        elif rows.delete()[0]:
+            Challenge.objects.filter(pk=ch.pk).update(unique_count=F("unique_count") - 1)
+            move_score(ch.unique_count, ch.unique_count - 1)
+        _move_first(user_id, old, first)
+    _bump_day(user_id, entry.date, entries=-1, grams=-(entry.amount_grams or 0))
+    bump_diary_version(user_id)
+
+def rebuild_progress(user_id, fix=True):
+    """
+    Сверить FirstEaten, счётчик челленджа, дневную статистику и журнал
+    синхронизации пользователя с DiaryEntry.
+    Вернёт число расхождений; при fix=True пересоберёт расходящееся.
+    """
+    with transaction.atomic():
+        ch = Challenge.objects.select_for_update().filter(user_id=user_id).first()
+        entries = DiaryEntry.objects.filter(user_id=user_id)
+        firsts = {}
+        if ch is not None:
+            firsts = dict(entries.filter(date__gte=ch.start_date, date__lte=ch.end_date)
+                          .values_list("product_id")
+                          .annotate(first=Min("date")))
+        actual = dict(FirstEaten.objects.filter(user_id=user_id).values_list("product_id", "first_date"))
+        broken_firsts = sum(1 for pk in firsts.keys() | actual.keys() if firsts.get(pk) != actual.get(pk))
+        broken_count = ch is not None and ch.unique_count != len(firsts)
+
+        new_per_day = {}
+        for d in firsts.values():
+            new_per_day[d] = new_per_day.get(d, 0) + 1
+        days = {
+            d: (n, new_per_day.get(d, 0), grams or 0)
+            for d, n, grams in entries.values_list("date").annotate(n=Count("id"), grams=Sum("amount_grams"))
+        }
+        actual_days = {
+            d: (n, new, grams)
+            for d, n, new, grams in DailyStats.objects.filter(user_id=user_id)
+            .values_list("date", "entries", "new_products", "grams")
+        }
+        broken_days = sum(1 for d in days.keys() | actual_days.keys() if days.get(d) != actual_days.get(d))
+
+        # синхронизация: у каждой записи — живая отметка изменения, у удалённых — «надгробие»
+        missing = stale = set()
+        if ch is not None:
+            keys = set(entries.values_list("product_id", "date"))
+            live = set(EntryChange.objects.filter(user_id=user_id, deleted=False).values_list("product_id", "date"))
+            missing, stale = keys - live, live - keys
+
+        if fix and (broken_firsts or broken_count):
+            FirstEaten.objects.filter(user_id=user_id).delete()
+            FirstEaten.objects.bulk_create(
+                [FirstEaten(user_id=user_id, product_id=pk, first_date=d) for pk, d in firsts.items()],
+                batch_size=1000,
+            )
+            if ch is not None:
+                Challenge.objects.filter(pk=ch.pk).update(unique_count=len(firsts))
+                move_score(ch.unique_count, len(firsts))
+        if fix and broken_days:
+            DailyStats.objects.filter(user_id=user_id).delete()
+            DailyStats.objects.bulk_create(
+                [DailyStats(user_id=user_id, date=d, entries=n, new_products=new, grams=grams)
+                 for d, (n, new, grams) in days.items()],
+                batch_size=1000,
+            )
+        if fix and (missing or stale):
+            _log_changes(ch, sorted(missing), deleted=False)
+            _log_changes(ch, sorted(stale), deleted=True)
+    return broken_firsts + broken_count + broken_days + len(missing) + len(stale)
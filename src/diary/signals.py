@@ -0,0 +1,16 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .leaderboard import move_score
+from .models import Challenge
+
+
+@receiver(post_save, sender=Challenge)
+def challenge_created(sender, instance, created, **kwargs):
+    if created:
+        move_score(None, instance.unique_count)
+
+
+@receiver(post_delete, sender=Challenge)
+def challenge_deleted(sender, instance, **kwargs):
+    move_score(instance.unique_count, None)
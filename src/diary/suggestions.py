@@ -0,0 +1,195 @@
+"""
+«Что ещё не пробовал»: подсказки продуктов для челленджа.
+
+Пакетная задача (manage.py build_suggestions, по расписанию) строит
+разреженную матрицу X пользователь × продукт из DiaryEntry (1 — ел хоть раз)
+и по ней — сходство продуктов по совместной встречаемости:
+
+    C = Xᵀ·X без диагонали, нормированное косинусом: C[i, j] / √(n_i · n_j),
+
+где n_i — сколько пользователей ели продукт i. У каждого продукта остаются
+только NEIGHBOURS ближайших соседей. Оценки для пользователя — X[u]·C;
+из них вычитается съеденное в окне челленджа (FirstEaten), в Suggestion
+пишутся лучшие K. Если совместных данных мало, хвост добирается самыми
+популярными продуктами. Пользователи обрабатываются пачками: плотных
+матриц размером с каталог не возникает.
+
+Страницы читают готовую таблицу одним запросом по (user, rank). То, что
+пользователь успел съесть после прогона, отсекается при чтении.
+
+NumPy и SciPy нужны только пакетной задаче — веб-процессы их не импортируют.
+"""
+import itertools
+import time
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+
+from .models import DiaryEntry, FirstEaten, Suggestion
+
+K = 20
+NEIGHBOURS = 50
+CHUNK = 2000
+SHOW = 6
+
+
+def ranked_for(model, user_id, done, related, limit):
+    """
+    Queryset готовых подсказок user_id из model (поля user, rank) по порядку,
+    без тех, для которых есть done — подзапрос с OuterRef на строку подсказки.
+    """
+    return (model.objects.filter(user_id=user_id)
+            .exclude(Exists(done))
+            .select_related(related)
+            .order_by("rank")[:limit])
+
+
+def store_ranked(model, user_ids, rows_for, chunk, say, started):
+    """
+    Пересобрать таблицу подсказок model пачками по chunk пользователей:
+    rows_for(start, block) даёт строки для block = user_ids[start:start + chunk],
+    пачка заменяется в одной транзакции. Подсказки пользователей не из user_ids
+    удаляются. Вернёт число записанных строк.
+    """
+    written = 0
+    for start in range(0, len(user_ids), chunk):
+        block = user_ids[start:start + chunk]
+        rows = rows_for(start, block)
+        with transaction.atomic():
+            model.objects.filter(user_id__in=block).delete()
+            model.objects.bulk_create(rows, batch_size=5000)
+        written += len(rows)
+        say(f"{min(start + chunk, len(user_ids))}/{len(user_ids)} пользователей, "
+            f"{time.monotonic() - started:.1f} с")
+
+    # у кого не осталось исходных данных — подсказки по старым не нужны
+    known = set(user_ids)
+    stale = [u for u in model.objects.values_list("user_id", flat=True).distinct() if u not in known]
+    for start in range(0, len(stale), chunk):
+        model.objects.filter(user_id__in=stale[start:start + chunk]).delete()
+    return written
+
+
+def suggestions_for(user_id, limit=SHOW):
+    """Queryset подсказок пользователя (с продуктами), без уже съеденного."""
+    tried = FirstEaten.objects.filter(user_id=user_id, product_id=OuterRef("product_id"))
+    return ranked_for(Suggestion, user_id, tried, "product", limit)
+
+
+def _top_per_row(m, k):
+    """CSR-матрица, в каждой строке которой оставлены k наибольших значений."""
+    import numpy as np
+    from scipy import sparse
+
+    indptr, indices, data = [0], [], []
+    for row in range(m.shape[0]):
+        start, end = m.indptr[row], m.indptr[row + 1]
+        values = m.data[start:end]
+        if end - start > k:
+            keep = np.argpartition(-values, k - 1)[:k]
+        else:
+            keep = np.arange(end - start)
+        keep = keep[np.argsort(-values[keep], kind="stable")]
+        indices.append(m.indices[start:end][keep])
+        data.append(values[keep])
+        indptr.append(indptr[-1] + len(keep))
+    return sparse.csr_matrix(
+        (np.concatenate(data) if data else [], np.concatenate(indices) if indices else [], indptr),
+        shape=m.shape,
+    )
+
+
+def _matrix(pairs, rows, cols):
+    """Бинарная CSR-матрица rows × cols из пар индексов (строка, столбец); -1 — пропуск."""
+    import numpy as np
+    from scipy import sparse
+
+    users, products = pairs
+    keep = (users >= 0) & (products >= 0)
+    m = sparse.csr_matrix(
+        (np.ones(keep.sum(), dtype=np.float32), (users[keep], products[keep])),
+        shape=(rows, cols),
+    )
+    m.data[:] = 1  # повторы пары (разные даты) сложились — нужен только факт
+    return m
+
+
+def _index(ids, universe):
+    """Позиции ids в отсортированном universe; -1 — если id там нет."""
+    import numpy as np
+
+    if not len(universe):
+        return np.full(len(ids), -1)
+    pos = np.searchsorted(universe, ids)
+    pos[pos >= len(universe)] = 0
+    return np.where(universe[pos] == ids, pos, -1)
+
+
+def _pairs(qs):
+    """(user_ids, product_ids) двумя массивами, без промежуточного списка кортежей."""
+    import numpy as np
+
+    flat = itertools.chain.from_iterable(
+        qs.values_list("user_id", "product_id").iterator(chunk_size=10_000))
+    arr = np.fromiter(flat, dtype=np.int64).reshape(-1, 2)
+    return arr[:, 0], arr[:, 1]
+
+
+def build_suggestions(k=K, neighbours=NEIGHBOURS, chunk=CHUNK, log=None):
+    """Пересобрать Suggestion для всех пользователей с записями; вернёт статистику."""
+    import numpy as np
+    from scipy import sparse
+
+    started = time.monotonic()
+    say = log or (lambda msg: None)
+
+    eaten_users, eaten_products = _pairs(DiaryEntry.objects)
+    user_ids = np.unique(eaten_users)
+    product_ids = np.unique(eaten_products)
+    X = _matrix((_index(eaten_users, user_ids), _index(eaten_products, product_ids)),
+                len(user_ids), len(product_ids))
+    say(f"Матрица {X.shape[0]} × {X.shape[1]}, {X.nnz} пар за {time.monotonic() - started:.1f} с")
+
+    # сходство продуктов: совместная встречаемость, нормированная популярностью
+    popularity = np.asarray(X.sum(axis=0)).ravel()
+    C = (X.T @ X).tocsr()
+    C.setdiag(0)
+    C.eliminate_zeros()
+    norm = sparse.diags(1 / np.sqrt(np.maximum(popularity, 1)))
+    C = _top_per_row((norm @ C @ norm).tocsr(), neighbours)
+    say(f"Соседи продуктов: {C.nnz} за {time.monotonic() - started:.1f} с")
+
+    tried_users, tried_products = _pairs(FirstEaten.objects)
+    T = _matrix((_index(tried_users, user_ids), _index(tried_products, product_ids)),
+                len(user_ids), len(product_ids))
+    # добор из популярных: с запасом на уже съеденное
+    popular = np.argsort(-popularity, kind="stable").tolist()
+
+    def rows_for(start, block):
+        scores = (X[start:start + len(block)] @ C).tocsr()
+        # съеденное в окне челленджа не предлагаем: обнуляем и выкидываем
+        scores = (scores - scores.multiply(T[start:start + len(block)])).tocsr()
+        scores.eliminate_zeros()
+        top = _top_per_row(scores, k)
+        rows = []
+        for i, uid in enumerate(block):
+            begin, end = top.indptr[i], top.indptr[i + 1]
+            picked = list(zip(top.indices[begin:end].tolist(), top.data[begin:end].tolist()))
+            if len(picked) < k:
+                row = start + i
+                seen = set(T.indices[T.indptr[row]:T.indptr[row + 1]].tolist())
+                seen.update(p for p, _ in picked)
+                for p in popular:
+                    if len(picked) >= k:
+                        break
+                    if p not in seen:
+                        picked.append((p, 0.0))
+            rows.extend(
+                Suggestion(user_id=uid, product_id=int(product_ids[p]), rank=rank, score=float(score))
+                for rank, (p, score) in enumerate(picked, start=1)
+            )
+        return rows
+
+    written = store_ranked(Suggestion, user_ids.tolist(), rows_for, chunk, say, started)
+    return {"users": len(user_ids), "products": len(product_ids), "suggestions": written,
+            "seconds": time.monotonic() - started}
@@ -0,0 +1,70 @@
+"""
+Дельта-синхронизация дневника для мобильных и офлайн-клиентов.
+
+Клиент хранит курсор — номер последнего изменения, которое он видел
+(EntryChange.seq). Сервер отдаёт записи, изменённые после курсора, и
+«надгробия» удалённых; запись определяется ключом (product_id, date) —
+он уникален у пользователя. Номера выдаются под блокировкой челленджа
+(services._log_changes), поэтому идут в порядке коммитов и между страницами
+ничего не теряется.
+"""
+from .models import DiaryEntry, EntryChange
+from .services import get_progress
+
+PAGE = 500
+
+
+def entry_payload(entry):
+    return {
+        "product_id": entry.product_id,
+        "date": entry.date.isoformat(),
+        "amount_grams": entry.amount_grams,
+        "note": entry.note,
+        "product": {"name": entry.product.name, "kind": entry.product.kind, "slug": entry.product.slug},
+        "created_at": entry.created_at.isoformat(),
+    }
+
+
+def changes_since(user, cursor, limit=PAGE):
+    """
+    {"cursor", "has_more", "reset", "entries", "deleted", "progress"} — изменения после cursor.
+    Курсор из будущего (другая база, потерянные данные) сбрасывается в 0: клиенту
+    нужно заново забрать всё ("reset": true).
+    """
+    ch = getattr(user, "challenge", None)
+    reset = cursor > (ch.sync_seq if ch else 0)
+    if reset:
+        cursor = 0
+
+    rows = list(EntryChange.objects
+                .filter(user=user, seq__gt=cursor)
+                .order_by("seq")
+                .values_list("product_id", "date", "seq", "deleted")[:limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    live = [(pk, d) for pk, d, _, deleted in rows if not deleted]
+    entries = {}
+    if live:
+        keys = set(live)
+        entries = {
+            (e.product_id, e.date): e
+            for e in DiaryEntry.objects
+            .filter(user=user, product_id__in={pk for pk, _ in keys}, date__in={d for _, d in keys})
+            .select_related("product")
+            if (e.product_id, e.date) in keys
+        }
+
+    unique_count, target, days_elapsed, days_total = get_progress(user)
+    return {
+        "cursor": rows[-1][2] if rows else cursor,
+        "has_more": has_more,
+        "reset": reset,
+        # запись могли удалить после чтения журнала — тогда её «надгробие» придёт следующей страницей
+        "entries": [entry_payload(entries[key]) for key in live if key in entries],
+        # с нуля клиенту нечего удалять
+        "deleted": [{"product_id": pk, "date": d.isoformat()}
+                    for pk, d, _, deleted in rows if deleted and cursor],
+        "progress": {"unique_count": unique_count, "target": target,
+                     "days_elapsed": days_elapsed, "days_total": days_total},
+    }
@@ -1,3 +1,338 @@
-from django.test import TestCase
+import datetime
+import json
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, connection
+from django.test import AsyncClient, TestCase
+from django.test.utils import CaptureQueriesContext
+
+from products.models import Product
+from social.models import Event, Follow
+from . import leaderboard
+from .models import (Challenge, DailyStats, DiaryEntry, EntryChange, FirstEaten, ScoreBucket, Suggestion,
+                     SyncRequest)
+from .services import rebuild_progress
+from .suggestions import build_suggestions
+
+User = get_user_model()
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email="export@example.com", password="p")
+        for i in range(5):
+            product = Product.objects.create(name=f"Продукт {i}", slug=f"export-{i}")
+            DiaryEntry.objects.create(user=cls.user, product=product, date=datetime.date(2026, 1, 1 + i))
+
+    def test_wsgi_streams_sync_iterator(self):
+        self.client.force_login(self.user)
+        response = self.client.get("/diary/export/", {"format": "ndjson"}, HTTP_HOST="localhost")
+        self.assertFalse(response.is_async)
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 5)
+        self.assertIn('"product": "Продукт 0"', lines[0])
+
+    async def test_asgi_streams_async_iterator_in_chunks(self):
+        client = AsyncClient(HTTP_HOST="localhost")
+        await client.aforce_login(self.user)
+        with mock.patch("diary.export.CHUNK_SIZE", 2):
+            response = await client.get("/diary/export/", {"format": "csv"})
+            self.assertTrue(response.is_async)
+            chunks = [chunk async for chunk in response.streaming_content]
+        # заголовок + 5 строк пачками по 2 — отдаётся по частям, а не одним списком
+        self.assertEqual(len(chunks), 3)
+        lines = b"".join(chunks).decode("utf-8-sig").splitlines()
+        self.assertEqual(len(lines), 6)
+        self.assertTrue(lines[0].startswith("date,product_id"))
+
+
+class MoveScoreTests(TestCase):
+    def test_counter_moves_keep_buckets_consistent(self):
+        leaderboard.move_score(None, 5)
+        leaderboard.move_score(None, 6)
+        leaderboard.move_score(5, 6)
+        leaderboard.move_score(6, 5)
+        leaderboard.move_score(6, 7)
+        counts = dict(ScoreBucket.objects.values_list("score", "users"))
+        self.assertEqual(counts, {5: 1, 6: 0, 7: 1})
+
+    def test_updates_lock_rows_in_ascending_score_order(self):
+        with CaptureQueriesContext(connection) as ctx:
+            leaderboard.move_score(6, 5)
+        updates = [q["sql"] for q in ctx.captured_queries if q["sql"].startswith("UPDATE")]
+        self.assertEqual(len(updates), 2)
+        self.assertIn("= 5", updates[0])
+        self.assertIn("= 6", updates[1])
+
+
+class YearViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email="year@example.com", password="p")
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_boundary_years_are_clamped(self):
+        for year, shown in [("1", 2), ("9999", 9998), ("99999", 9998), ("2026", 2026)]:
+            with self.subTest(year=year):
+                response = self.client.get("/diary/year/", {"year": year}, HTTP_HOST="localhost")
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.context["start"], datetime.date(shown, 1, 1))
+                self.assertEqual(response.context["end"], datetime.date(shown, 12, 31))
+
+    def test_stats_json_boundary_year(self):
+        response = self.client.get("/diary/stats/", {"year": "9999"}, HTTP_HOST="localhost")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["end"], "9998-12-31")
+
+
+class BuildSuggestionsTests(TestCase):
+    def test_rebuild_replaces_rows_and_drops_stale_users(self):
+        products = [Product.objects.create(name=f"П {i}", slug=f"sugg-{i}") for i in range(4)]
+        users = [User.objects.create_user(email=f"sugg{i}@example.com", password="p") for i in range(3)]
+        day = datetime.date(2026, 1, 1)
+        for user in users[:2]:
+            for product in products[:3]:
+                DiaryEntry.objects.create(user=user, product=product, date=day)
+        DiaryEntry.objects.create(user=users[2], product=products[0], date=day)
+        Suggestion.objects.create(user=users[0], product=products[3], rank=1, score=0)
+
+        stats = build_suggestions(k=2, chunk=1)
+        self.assertEqual(stats["users"], 3)
+        ranks = list(Suggestion.objects.filter(user=users[2]).values_list("rank", flat=True).order_by("rank"))
+        self.assertEqual(ranks, [1, 2])
+
+        DiaryEntry.objects.filter(user=users[2]).delete()
+        build_suggestions(k=2, chunk=1)
+        self.assertFalse(Suggestion.objects.filter(user=users[2]).exists())
+
+
+class AdminEditFeedTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(email="author@example.com", password="p")
+        cls.follower = User.objects.create_user(email="follower@example.com", password="p")
+        cls.admin = User.objects.create_superuser(email="admin@example.com", password="p")
+        Follow.objects.create(follower=cls.follower, followee=cls.author)
+        cls.apple = Product.objects.create(name="Яблоко", slug="admin-apple")
+        cls.pear = Product.objects.create(name="Груша", slug="admin-pear")
+
+    def test_admin_product_change_replaces_entry_in_feed(self):
+        day = datetime.date.today()
+        self.client.force_login(self.author)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post("/diary/add/", {"product_id": self.apple.pk, "date": day.isoformat()},
+                             HTTP_HOST="localhost")
+        entry = DiaryEntry.objects.get(user=self.author)
+
+        self.client.force_login(self.admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f"/admin/diary/diaryentry/{entry.pk}/change/", {
+                "user": self.author.pk, "date": day.isoformat(), "product": self.pear.pk,
+                "amount_grams": "", "note": "",
+            }, HTTP_HOST="localhost")
+        self.assertEqual(response.status_code, 302)
+
+        payloads = list(Event.objects.filter(user=self.author).values_list("payload", flat=True))
+        self.assertEqual(payloads, [{"product_ids": [self.pear.pk], "date": day.isoformat()}])
+        self.client.force_login(self.follower)
+        html = self.client.get("/social/feed/", HTTP_HOST="localhost").content.decode()
+        self.assertIn("Груша", html)
+        self.assertNotIn("Яблоко", html)
+
+
+class BatchAddTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email="batch@example.com", password="p")
+        cls.products = [Product.objects.create(name=f"Пачка {i}", slug=f"batch-{i}") for i in range(3)]
+
+    def _post(self, rows):
+        return self.client.post("/diary/add/batch/", json.dumps({"entries": rows}),
+                                content_type="application/json", HTTP_HOST="localhost")
+
+    def test_duplicates_skipped_and_conflict_rolls_back(self):
+        self.client.force_login(self.user)
+        day = datetime.date.today().isoformat()
+        a, b, c = (p.pk for p in self.products)
+        response = self._post([{"product_id": a, "date": day}, {"product_id": a, "date": day}])
+        self.assertEqual(response.json(), {"created": 1, "duplicates": [1]})
+
+        response = self._post([{"product_id": a, "date": day}, {"product_id": b, "date": day}])
+        self.assertEqual(response.json(), {"created": 1, "duplicates": [0]})
+        self.assertEqual(Challenge.objects.get(user=self.user).unique_count, 2)
+
+        # проверку дубликатов обошли — вставка падает целиком, счётчики не трогаются
+        with mock.patch("diary.views.DiaryEntry.objects.filter") as existing:
+            existing.return_value.values_list.return_value = []
+            with self.assertRaises(IntegrityError):
+                self._post([{"product_id": c, "date": day}, {"product_id": a, "date": day}])
+        self.assertEqual(DiaryEntry.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(rebuild_progress(self.user.pk, fix=False), 0)
+
+
+class ProgressConsistencyTests(TestCase):
+    """Каждый путь записи держит счётчики такими же, какими их пересчитает rebuild_progress."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email="counter@example.com", password="p")
+        cls.other = User.objects.create_user(email="other@example.com", password="p")
+        cls.admin = User.objects.create_superuser(email="counter-admin@example.com", password="p")
+        cls.p = [Product.objects.create(name=f"Счётчик {i}", slug=f"counter-{i}") for i in range(5)]
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        self.client.post("/diary/join/", HTTP_HOST="localhost")
+        self.day = [datetime.date.today() + datetime.timedelta(days=i) for i in range(3)]
+
+    def _state(self):
+        user = self.user.pk
+        return {
+            "unique_count": Challenge.objects.get(user=user).unique_count,
+            "first_eaten": dict(FirstEaten.objects.filter(user=user).values_list("product_id", "first_date")),
+            "days": set(DailyStats.objects.filter(user=user).values_list("date", "entries", "new_products", "grams")),
+            "buckets": dict(ScoreBucket.objects.filter(users__gt=0).values_list("score", "users")),
+            "changes": set(EntryChange.objects.filter(user=user).values_list("product_id", "date", "deleted")),
+        }
+
+    def assertConsistent(self):
+        state = self._state()
+        self.assertEqual(rebuild_progress(self.user.pk, fix=False), 0)
+        self.assertEqual(leaderboard.rebuild_buckets(fix=False), 0)
+        rebuild_progress(self.user.pk)
+        leaderboard.rebuild_buckets()
+        self.assertEqual(self._state(), state)
+        return state
+
+    def _add(self, product, day, grams=""):
+        self.client.post("/diary/add/", {"product_id": product.pk, "date": day.isoformat(), "amount_grams": grams},
+                         HTTP_HOST="localhost")
+
+    def _entry(self, product, day):
+        return DiaryEntry.objects.get(user=self.user, product=product, date=day)
+
+    def test_every_write_path_keeps_counters_consistent(self):
+        a, b, c, d, e = self.p
+        today, tomorrow, later = self.day
+
+        self._add(a, today, 100)
+        self._add(a, tomorrow)
+        state = self.assertConsistent()
+        self.assertEqual(state["unique_count"], 1)
+        self.assertEqual(state["first_eaten"], {a.pk: today})
+
+        self.client.post("/diary/add/batch/", json.dumps({"entries": [
+            {"product_id": b.pk, "date": today.isoformat(), "amount_grams": 50},
+            {"product_id": c.pk, "date": tomorrow.isoformat()},
+            {"product_id": a.pk, "date": later.isoformat()},
+        ]}), content_type="application/json", HTTP_HOST="localhost")
+        self.assertEqual(self.assertConsistent()["unique_count"], 3)
+
+        # удалили первую запись продукта — «первое знакомство» переезжает на следующую
+        self.client.post(f"/diary/delete/{self._entry(a, today).pk}/", HTTP_HOST="localhost")
+        state = self.assertConsistent()
+        self.assertEqual(state["first_eaten"][a.pk], tomorrow)
+        self.assertIn((a.pk, today, True), state["changes"])
+
+        self.client.force_login(self.admin)
+        entry = self._entry(c, tomorrow)
+        self.client.post(f"/admin/diary/diaryentry/{entry.pk}/change/", {
+            "user": self.user.pk, "date": later.isoformat(), "product": d.pk, "amount_grams": "30", "note": "",
+        }, HTTP_HOST="localhost")
+        state = self.assertConsistent()
+        self.assertEqual(set(state["first_eaten"]), {a.pk, b.pk, d.pk})
+
+        self.client.force_login(self.user)
+        self.client.post("/diary/api/sync/", json.dumps({
+            "cursor": 0,
+            "entries": [{"product_id": e.pk, "date": today.isoformat()}],
+            "deleted": [{"product_id": b.pk, "date": today.isoformat()}],
+        }), content_type="application/json", HTTP_HOST="localhost")
+        state = self.assertConsistent()
+        self.assertEqual(set(state["first_eaten"]), {a.pk, d.pk, e.pk})
+        self.assertEqual(state["unique_count"], 3)
+
+        # и чужой челлендж в той же гистограмме
+        self.client.force_login(self.other)
+        self.client.post("/diary/join/", HTTP_HOST="localhost")
+        self._add(a, today)
+        self.assertEqual(self.assertConsistent()["buckets"], {1: 1, 3: 1})
+
+
+class SyncTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email="sync@example.com", password="p")
+        cls.p = [Product.objects.create(name=f"Синк {i}", slug=f"sync-{i}") for i in range(4)]
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        self.today = datetime.date.today().isoformat()
+
+    def _get(self, cursor, **params):
+        return self.client.get("/diary/api/sync/", {"cursor": cursor, **params}, HTTP_HOST="localhost").json()
+
+    def _post(self, body, key=None):
+        headers = {"HTTP_IDEMPOTENCY_KEY": key} if key else {}
+        return self.client.post("/diary/api/sync/", json.dumps(body), content_type="application/json",
+                                HTTP_HOST="localhost", **headers).json()
+
+    def _row(self, product):
+        return {"product_id": product.pk, "date": self.today}
+
+    def test_cursor_pages_and_tombstones(self):
+        a, b, c, _ = self.p
+        data = self._post({"cursor": 0, "entries": [self._row(a), self._row(b), self._row(c)]})
+        self.assertEqual(data["upload"], {"created": 3, "duplicates": [], "removed": 0})
+        self.assertEqual(len(data["entries"]), 3)
+        self.assertEqual(data["deleted"], [])
+        cursor = data["cursor"]
+
+        # ничего нового — пустая страница, курсор на месте
+        data = self._get(cursor)
+        self.assertEqual((data["entries"], data["deleted"], data["cursor"], data["reset"]), ([], [], cursor, False))
+
+        self._post({"cursor": cursor, "deleted": [self._row(b)]})
+        data = self._get(cursor)
+        self.assertEqual(data["entries"], [])
+        self.assertEqual(data["deleted"], [self._row(b)])
+        self.assertEqual(data["progress"]["unique_count"], 2)
+
+        # с нуля — страницами; на первой «надгробий» нет, дальше лишнее клиент пропустит
+        first = self._get(0, limit=1)
+        self.assertTrue(first["has_more"])
+        self.assertEqual(len(first["entries"]), 1)
+        self.assertEqual(first["deleted"], [])
+        rest = self._get(first["cursor"])
+        self.assertFalse(rest["has_more"])
+        self.assertEqual({e["product_id"] for e in first["entries"] + rest["entries"]}, {a.pk, c.pk})
+        self.assertEqual(rest["deleted"], [self._row(b)])
+
+    def test_cursor_ahead_of_server_resets(self):
+        self._post({"cursor": 0, "entries": [self._row(self.p[0])]})
+        data = self._get(10_000)
+        self.assertTrue(data["reset"])
+        self.assertEqual([e["product_id"] for e in data["entries"]], [self.p[0].pk])
+
+    def test_idempotency_key_replay_writes_nothing(self):
+        body = {"cursor": 0, "entries": [self._row(self.p[0]), self._row(self.p[1])]}
+        first = self._post(body, key="retry-1")
+        seq = Challenge.objects.get(user=self.user).sync_seq
+        changes = EntryChange.objects.count()
+
+        # повтор после обрыва: тот же итог, ни записей, ни номеров изменений
+        DiaryEntry.objects.filter(user=self.user, product=self.p[1]).delete()
+        again = self._post(body, key="retry-1")
+        self.assertEqual(again["upload"], first["upload"])
+        self.assertEqual(DiaryEntry.objects.filter(user=self.user).count(), 1)
+        self.assertEqual(Challenge.objects.get(user=self.user).sync_seq, seq)
+        self.assertEqual(EntryChange.objects.count(), changes)
+        self.assertEqual(SyncRequest.objects.filter(user=self.user).count(), 1)
+
+        # другой ключ — новая загрузка
+        fresh = self._post(body, key="retry-2")
+        self.assertEqual(fresh["upload"]["created"], 1)
@@ -6,7 +6,15 @@ app_name = "diary"
 urlpatterns = [
     path("", views.diary_view, name="index"),
     path("month/", views.month_view, name="month"),
+    path("year/", views.year_view, name="year"),
+    path("stats/", views.stats_json, name="stats"),
+    path("export/", views.export_entries, name="export"),
+    path("nutrition/", views.nutrition_view, name="nutrition"),
+    path("nutrition.json", views.nutrition_json, name="nutrition_json"),
+    path("leaderboard/", views.leaderboard_view, name="leaderboard"),
+    path("api/sync/", views.sync, name="sync"),
     path("add/", views.add_entry, name="add"),
+    path("add/batch/", views.add_entries, name="add_batch"),
     path("delete/<int:entry_id>/", views.delete_entry, name="delete"),
     path("join/", views.join_challenge, name="join"),
 ]
\ No newline at end of file
@@ -1,17 +1,29 @@
+import asyncio
 import calendar
 import datetime
+import json
 
+from asgiref.sync import sync_to_async
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.db import IntegrityError
-from django.db.models import Count
+from django.core.handlers.asgi import ASGIRequest
+from django.db import IntegrityError, transaction
+from django.views.decorators.http import require_POST
+from django.http import JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.utils import timezone
 from django.urls import reverse
 
-from .models import DiaryEntry
-from .services import ensure_challenge_for, get_progress
-from products.models import Product
-from social.models import Event
+from .export import FORMATS, aexport_lines, export_lines
+from . import leaderboard
+from .models import DailyStats, DiaryEntry, SyncRequest
+from .sync import PAGE as SYNC_PAGE, changes_since
+from .nutrition import PERIODS, nutrition_summary
+from .suggestions import suggestions_for
+from .services import aget_progress, ensure_challenge_for, entries_added, entry_added, entry_removed, lock_diary, request_user
+from products.models import NUTRIENTS, Product
+from social.events import forget_entries, record_entries
+from social.graph import following_ids
 
 
 @login_required
@@ -31,7 +43,8 @@ def add_entry(request):
     Добавление записи в дневник (через POST).
     Ожидает: product_id (обязательно), date (YYYY-MM-DD, опционально),
     amount_grams (опционально), note (опционально).
-    При успехе создает событие для ленты (Event) с product_slug.
+    При успехе отражает запись в ленте (social/events.py): новое событие
+    или дописывание в открытое событие той же даты.
     """
     if request.method != "POST":
         return redirect("diary:index")
@@ -41,7 +54,10 @@ def add_entry(request):
     amount = request.POST.get("amount_grams")
     note = (request.POST.get("note") or "").strip()
 
-    if not product_id:
+    try:
+        # строкой из формы id не годится: счётчики сверяют его с числами из базы
+        product_id = int(product_id)
+    except (TypeError, ValueError):
         messages.error(request, "Не указан продукт.")
         return redirect("diary:index")
 
@@ -55,26 +71,18 @@ def add_entry(request):
     ensure_challenge_for(request.user)
 
     try:
-        entry = DiaryEntry.objects.create(
-            user=request.user,
-            product_id=product_id,
-            date=date,
-            amount_grams=int(amount) if amount else None,
-            note=note,
-        )
-        # событие ленты
-        p = Product.objects.get(id=product_id)
-        Event.objects.create(
-            user=request.user,
-            type="entry_created",
-            payload={
-                "product_id": p.id,
-                "product_slug": p.slug,  # <<< добавили slug
-                "product_name": p.name,
-                "kind": p.kind,
-                "date": date.isoformat(),
-            },
-        )
+        with transaction.atomic():
+            lock_diary(request.user.pk)
+            entry = DiaryEntry.objects.create(
+                user=request.user,
+                product_id=product_id,
+                date=date,
+                amount_grams=int(amount) if amount else None,
+                note=note,
+            )
+            # счётчик прогресса и событие ленты — в той же транзакции, что и запись
+            entry_added(entry)
+            record_entries(request.user.pk, [entry])
         messages.success(request, f"Добавлено на {date.isoformat()}.")
     except IntegrityError:
         messages.info(request, "Этот продукт уже отмечен на выбранную дату.")
@@ -83,6 +91,107 @@ def add_entry(request):
     return redirect(next_url)
 
 
+BATCH_MAX = 500
+
+
+def _parse_batch_row(row, today):
+    """Строка пачки → (product_id, date, amount_grams, note) или текст ошибки."""
+    if not isinstance(row, dict):
+        return "ожидается объект"
+    try:
+        product_id = int(row.get("product_id"))
+    except (TypeError, ValueError):
+        return "не указан продукт"
+    try:
+        date = datetime.date.fromisoformat(row["date"]) if row.get("date") else today
+    except (TypeError, ValueError):
+        return "неверная дата"
+    amount = row.get("amount_grams")
+    if amount in (None, ""):
+        amount = None
+    else:
+        try:
+            amount = int(amount)
+        except (TypeError, ValueError):
+            return "неверное количество граммов"
+        if amount < 1:
+            return "неверное количество граммов"
+    note = str(row.get("note") or "").strip()
+    if len(note) > DiaryEntry._meta.get_field("note").max_length:
+        return "слишком длинная заметка"
+    return product_id, date, amount, note
+
+
+def _parse_batch(rows):
+    """Строки пачки → (parsed, {id: Product}, errors); parsed годен, только если errors пуст."""
+    today = datetime.date.today()
+    parsed = [_parse_batch_row(row, today) for row in rows]
+    products = Product.objects.in_bulk({p[0] for p in parsed if isinstance(p, tuple)})
+    errors = []
+    for i, p in enumerate(parsed):
+        if isinstance(p, str):
+            errors.append({"row": i, "error": p})
+        elif p[0] not in products:
+            errors.append({"row": i, "error": "продукт не найден"})
+    return parsed, products, errors
+
+
+def _insert_batch(user, parsed, products):
+    """
+    Вставить проверенные строки пачкой (вызывать в транзакции после lock_diary).
+    Вернёт (новые записи, номера строк-дубликатов).
+    """
+    existing = set(
+        DiaryEntry.objects
+        .filter(user=user, product_id__in=products, date__in={p[1] for p in parsed})
+        .values_list("product_id", "date")
+    )
+    new, duplicates = [], []
+    for i, (product_id, date, amount, note) in enumerate(parsed):
+        if (product_id, date) in existing:
+            duplicates.append(i)
+            continue
+        existing.add((product_id, date))
+        new.append(DiaryEntry(user=user, product_id=product_id, date=date, amount_grams=amount, note=note))
+    # под блокировкой дневника конфликтов нет; если всё же случится — IntegrityError
+    # откатит транзакцию, а не оставит счётчики, посчитанные по невставленным строкам
+    DiaryEntry.objects.bulk_create(new)
+    entries_added(new)
+    record_entries(user.pk, new)
+    return new, duplicates
+
+
+@login_required
+@require_POST
+def add_entries(request):
+    """
+    Пакетное добавление записей: POST JSON
+    {"entries": [{"product_id", "date"?, "amount_grams"?, "note"?}, …]}.
+    Строки проверяются вместе; при любой ошибке ничего не пишется (400, "errors").
+    Иначе всё — записи, счётчики, события ленты — вставляется пачками в одной
+    транзакции. Ответ: {"created": N, "duplicates": [номера строк]} — дубликаты
+    (уже есть запись продукта на эту дату или повтор внутри пачки) пропускаются.
+    """
+    try:
+        rows = json.loads(request.body)["entries"]
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({"errors": [{"row": None, "error": "ожидается JSON с полем entries"}]}, status=400)
+    if not isinstance(rows, list) or not 1 <= len(rows) <= BATCH_MAX:
+        return JsonResponse({"errors": [{"row": None, "error": f"от 1 до {BATCH_MAX} строк"}]}, status=400)
+
+    parsed, products, errors = _parse_batch(rows)
+    if errors:
+        return JsonResponse({"errors": errors}, status=400)
+
+    user = request.user
+    with transaction.atomic():
+        ensure_challenge_for(user)
+        lock_diary(user.pk)
+        new, duplicates = _insert_batch(user, parsed, products)
+
+    return JsonResponse({"created": len(new), "duplicates": duplicates})
+
+
 @login_required
 def delete_entry(request, entry_id: int):
     """
@@ -91,46 +200,64 @@ def delete_entry(request, entry_id: int):
     if request.method != "POST":
         messages.error(request, "Удаление разрешено только через POST.")
         return redirect("diary:index")
-    entry = get_object_or_404(DiaryEntry, id=entry_id, user=request.user)
-    entry.delete()
+    with transaction.atomic():
+        lock_diary(request.user.pk)
+        entry = get_object_or_404(DiaryEntry, id=entry_id, user=request.user)
+        entry.delete()
+        entry_removed(entry)
+        forget_entries([entry])
     messages.info(request, "Запись удалена.")
     return redirect("diary:index")
 
 
 @login_required
-def diary_view(request):
+async def diary_view(request):
     """
     Главная страница дневника: показывает прогресс и список записей за выбранную дату.
     GET ?date=YYYY-MM-DD — опционально.
+    Асинхронная: запросы (прогресс, записи, итоги дня) не блокируют цикл событий,
+    но асинхронный ORM выполняет их по очереди в одном потоке; шаблон рендерится там же.
     """
     date_str = request.GET.get("date")
     try:
         current_date = datetime.date.fromisoformat(date_str) if date_str else datetime.date.today()
     except ValueError:
         current_date = datetime.date.today()
+    user = await request_user(request)
 
-    unique_count, target, days_elapsed, days_total = get_progress(request.user)
-
-    entries = (
+    entries_qs = (
         DiaryEntry.objects
-        .filter(user=request.user, date=current_date)
+        .filter(user=user, date=current_date)
         .select_related("product")
         .order_by("product__name", "product__kind")
     )
+    progress, entries, nutrition, suggestions = await asyncio.gather(
+        aget_progress(user),
+        _alist(entries_qs),
+        # итоги дня одним агрегирующим запросом (или из кэша)
+        sync_to_async(nutrition_summary)(user, "day", current_date),
+        # что попробовать — из готовой таблицы подсказок
+        _alist(suggestions_for(user.pk)),
+    )
+    # контекст-процессор возьмёт готовый прогресс, а не пойдёт в БД ещё раз
+    request.diary_progress = progress
+    unique_count, target, days_elapsed, days_total = progress
 
     ctx = {
         "current_date": current_date,
         "entries": entries,
+        "day_totals": nutrition["totals"],
+        "suggestions": suggestions,
         "unique_count": unique_count,
         "target": target,
         "days_elapsed": days_elapsed,
         "days_total": days_total,
     }
-    return render(request, "diary/index.html", ctx)
+    return await sync_to_async(render)(request, "diary/index.html", ctx)
 
 
 @login_required
-def month_view(request):
+async def month_view(request):
     """
     Календарь на месяц с количеством записей по дням.
     GET-параметры:
@@ -141,19 +268,21 @@ def month_view(request):
     today = datetime.date.today()
     year = int(request.GET.get("year", today.year))
     month = int(request.GET.get("month", today.month))
+    user = await request_user(request)
 
     # границы месяца
     first_day = datetime.date(year, month, 1)
     last_day = datetime.date(year, month, calendar.monthrange(year, month)[1])
 
-    # количество записей по дням
-    counts = (
-        DiaryEntry.objects
-        .filter(user=request.user, date__gte=first_day, date__lte=last_day)
-        .values("date")
-        .annotate(n=Count("id"))
+    # количество записей по дням — из готовой дневной статистики
+    days_qs = (
+        DailyStats.objects
+        .filter(user=user, date__gte=first_day, date__lte=last_day)
+        .values_list("date", "entries")
     )
-    per_day = {row["date"]: row["n"] for row in counts}
+    progress, days = await asyncio.gather(aget_progress(user), _alist(days_qs))
+    request.diary_progress = progress
+    per_day = dict(days)
 
     # сетка календаря (недели по 7 дней, пустые слоты = None)
     cal = calendar.Calendar(firstweekday=0)  # 0 = понедельник
@@ -169,7 +298,7 @@ def month_view(request):
             week.append(None)
         weeks.append(week)
 
-    unique_count, target, days_elapsed, days_total = get_progress(request.user)
+    unique_count, target, days_elapsed, days_total = progress
 
     # даты для переключателей
     prev_month = (first_day - datetime.timedelta(days=1)).replace(day=1)
@@ -190,4 +319,276 @@ def month_view(request):
         "next_month": next_month.month,
         "today": today,
     }
-    return render(request, "diary/month.html", ctx)
\ No newline at end of file
+    return await sync_to_async(render)(request, "diary/month.html", ctx)
+
+
+async def _alist(qs):
+    return [row async for row in qs]
+
+
+def _stats_window(request):
+    """
+    Окно годовой карты: ?year=YYYY — календарный год, иначе окно челленджа,
+    а без челленджа — последние 365 дней.
+    """
+    year = request.GET.get("year")
+    if year and year.isdigit():
+        # сетка недель выходит за границы года, а ссылки ведут на соседние годы —
+        # крайние годы календаря не показываем, иначе date ± timedelta переполнится
+        year = min(max(int(year), datetime.MINYEAR + 1), datetime.MAXYEAR - 1)
+        return datetime.date(year, 1, 1), datetime.date(year, 12, 31)
+    ch = getattr(request.user, "challenge", None)
+    if ch:
+        return ch.start_date, ch.end_date
+    today = datetime.date.today()
+    return today - datetime.timedelta(days=364), today
+
+
+def _daily_stats(user, start, end):
+    """{дата: DailyStats} за окно — одно чтение по индексу (user, date)."""
+    return {s.date: s for s in DailyStats.objects.filter(user=user, date__gte=start, date__lte=end)}
+
+
+def _heat_level(entries):
+    # 0 — пусто, дальше примерно как у GitHub: 1, 2–3, 4–6, 7+
+    if not entries:
+        return 0
+    return 1 if entries == 1 else 2 if entries <= 3 else 3 if entries <= 6 else 4
+
+
+@login_required
+def year_view(request):
+    """
+    Годовая карта активности: столбец — неделя (с понедельника), клетка — день,
+    цвет — число записей. GET ?year=YYYY, по умолчанию — окно челленджа.
+    """
+    start, end = _stats_window(request)
+    stats = _daily_stats(request.user, start, end)
+
+    weeks = []
+    d = start - datetime.timedelta(days=start.weekday())
+    while d <= end:
+        week = []
+        for _ in range(7):
+            s = stats.get(d)
+            week.append(None if d < start or d > end else {
+                "date": d,
+                "entries": s.entries if s else 0,
+                "new_products": s.new_products if s else 0,
+                "grams": s.grams if s else 0,
+                "level": _heat_level(s.entries if s else 0),
+            })
+            d += datetime.timedelta(days=1)
+        weeks.append(week)
+
+    ctx = {
+        "start": start,
+        "end": end,
+        "weeks": weeks,
+        "total_entries": sum(s.entries for s in stats.values()),
+        "total_new": sum(s.new_products for s in stats.values()),
+        "active_days": len(stats),
+        "prev_year": start.year - 1,
+        "next_year": start.year + 1,
+        "today": datetime.date.today(),
+    }
+    return render(request, "diary/year.html", ctx)
+
+
+@login_required
+def stats_json(request):
+    """
+    Дневная статистика за окно (см. _stats_window) в JSON — только непустые дни:
+    {"start", "end", "days": [{"date", "entries", "new_products", "grams"}]}.
+    """
+    start, end = _stats_window(request)
+    stats = _daily_stats(request.user, start, end)
+    return JsonResponse({
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "days": [
+            {"date": d.isoformat(), "entries": s.entries, "new_products": s.new_products, "grams": s.grams}
+            for d, s in sorted(stats.items())
+        ],
+    })
+
+
+@login_required
+def export_entries(request):
+    """
+    Вся история дневника с нутриентами продуктов: GET ?format=csv|ndjson.
+    Отдаётся потоком — память не зависит от числа записей (см. diary/export.py);
+    под ASGI — асинхронным итератором, под WSGI — обычным.
+    """
+    fmt = request.GET.get("format", "csv")
+    if fmt not in FORMATS:
+        fmt = "csv"
+    content_type, ext = FORMATS[fmt]
+    lines = aexport_lines if isinstance(request, ASGIRequest) else export_lines
+    response = StreamingHttpResponse(
+        lines(fmt, DiaryEntry.objects.filter(user=request.user)),
+        content_type=content_type,
+    )
+    response["Content-Disposition"] = f'attachment; filename="diary-{datetime.date.today():%Y-%m-%d}.{ext}"'
+    return response
+
+
+def _nutrition_params(request):
+    period = request.GET.get("period", "day")
+    if period not in PERIODS:
+        period = "day"
+    try:
+        date = datetime.date.fromisoformat(request.GET.get("date", ""))
+    except ValueError:
+        date = datetime.date.today()
+    return period, date
+
+
+@login_required
+def nutrition_view(request):
+    """
+    Ккал и БЖУ по дням за период: GET ?period=day|week|challenge&date=YYYY-MM-DD.
+    """
+    period, date = _nutrition_params(request)
+    summary = nutrition_summary(request.user, period, date)
+    step = datetime.timedelta(days=7 if period == "week" else 1)
+    ctx = {
+        "period": period,
+        "date": date,
+        "summary": summary,
+        "prev_date": summary["start"] - step if period != "challenge" else None,
+        "next_date": summary["start"] + step if period != "challenge" else None,
+    }
+    return render(request, "diary/nutrition.html", ctx)
+
+
+@login_required
+def nutrition_json(request):
+    """То же, что nutrition_view, в JSON; числа — строками, чтобы не терять точность."""
+    period, date = _nutrition_params(request)
+    summary = nutrition_summary(request.user, period, date)
+
+    def plain(row):
+        return {k: (v.isoformat() if k == "date" else str(v) if k in NUTRIENTS else v) for k, v in row.items()}
+
+    return JsonResponse({
+        "period": period,
+        "start": summary["start"].isoformat(),
+        "end": summary["end"].isoformat(),
+        "days": [plain(d) for d in summary["days"]],
+        "totals": plain(summary["totals"]),
+    })
+
+
+@login_required
+def leaderboard_view(request):
+    """
+    Рейтинг челленджа по числу уникальных продуктов.
+    GET ?scope=following — среди моих подписок, иначе общий топ и моё место.
+    """
+    scope = "following" if request.GET.get("scope") == "following" else "all"
+    ch = getattr(request.user, "challenge", None)
+    my_score = ch.unique_count if ch else None
+
+    if scope == "following":
+        rows = leaderboard.among(list(following_ids(request.user.pk)) + [request.user.pk])
+        my_rank = next((rank for rank, user, _ in rows if user.pk == request.user.pk), None)
+        total = len(rows)
+    else:
+        rows = leaderboard.top()
+        my_rank = leaderboard.rank_of(my_score) if ch else None
+        total = leaderboard.total_users()
+
+    ctx = {
+        "scope": scope,
+        "rows": rows,
+        "my_rank": my_rank,
+        "my_score": my_score,
+        "total": total,
+    }
+    return render(request, "diary/leaderboard.html", ctx)
+
+
+def _sync_cursor(value):
+    try:
+        return max(int(value or 0), 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _sync_deletes(user, rows):
+    """Удалить записи по ключам [{"product_id", "date"}]; вернёт число удалённых или текст ошибки."""
+    keys = set()
+    for row in rows:
+        try:
+            keys.add((int(row["product_id"]), datetime.date.fromisoformat(row["date"])))
+        except (TypeError, ValueError, KeyError):
+            return "неверный ключ удаления"
+    if not keys:
+        return 0
+    removed = []
+    for entry in DiaryEntry.objects.filter(
+        user=user, product_id__in={pk for pk, _ in keys}, date__in={d for _, d in keys},
+    ):
+        if (entry.product_id, entry.date) in keys:
+            entry.delete()
+            entry_removed(entry)
+            removed.append(entry)
+    forget_entries(removed)
+    return len(removed)
+
+
+@login_required
+def sync(request):
+    """
+    Дельта-синхронизация для клиентов (см. diary/sync.py).
+
+    GET ?cursor=N[&limit=M] — изменения после курсора.
+    POST JSON {"cursor", "entries": [как в add_entries], "deleted": [{"product_id", "date"}]}
+    — сначала загрузка офлайн-изменений одной транзакцией, затем те же изменения
+    после курсора. С заголовком Idempotency-Key повтор запроса (например, после
+    обрыва связи) ничего не пишет и возвращает прежний итог загрузки.
+    """
+    try:
+        limit = min(max(int(request.GET.get("limit", SYNC_PAGE)), 1), SYNC_PAGE)
+    except ValueError:
+        limit = SYNC_PAGE
+    user = request.user
+
+    if request.method != "POST":
+        return JsonResponse(changes_since(user, _sync_cursor(request.GET.get("cursor")), limit))
+
+    try:
+        body = json.loads(request.body)
+        rows, deletes = body.get("entries") or [], body.get("deleted") or []
+    except (ValueError, AttributeError):
+        return JsonResponse({"errors": [{"row": None, "error": "ожидается JSON"}]}, status=400)
+    if not isinstance(rows, list) or not isinstance(deletes, list) or len(rows) + len(deletes) > BATCH_MAX:
+        return JsonResponse({"errors": [{"row": None, "error": f"не больше {BATCH_MAX} изменений"}]}, status=400)
+
+    parsed, products, errors = _parse_batch(rows)
+    if errors:
+        return JsonResponse({"errors": errors}, status=400)
+
+    key = request.headers.get("Idempotency-Key", "")[:64]
+    with transaction.atomic():
+        ch = ensure_challenge_for(user)
+        lock_diary(user.pk)
+        # ключ проверяем под блокировкой: параллельный повтор дождётся первого запроса
+        stored = SyncRequest.objects.filter(user=user, key=key).first() if key else None
+        if stored is not None:
+            upload = stored.response
+        else:
+            removed = _sync_deletes(user, deletes)
+            if isinstance(removed, str):
+                transaction.set_rollback(True)
+                return JsonResponse({"errors": [{"row": None, "error": removed}]}, status=400)
+            new, duplicates = _insert_batch(user, parsed, products) if parsed else ([], [])
+            upload = {"created": len(new), "duplicates": duplicates, "removed": removed}
+            if key:
+                SyncRequest.objects.create(user=user, key=key, response=upload)
+                # ключи нужны только на время повторов
+                SyncRequest.objects.filter(user=user, created_at__lt=timezone.now() - datetime.timedelta(days=1)).delete()
+    ch.refresh_from_db()
+
+    return JsonResponse({"upload": upload, **changes_since(user, _sync_cursor(body.get("cursor")), limit)})
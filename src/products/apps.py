@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class ProductsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'products'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .search import FTS_TABLE, connect_sqlite_fts, install_sqlite_fts
+        connect_sqlite_fts(self, FTS_TABLE, install_sqlite_fts)
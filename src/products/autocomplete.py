@@ -0,0 +1,80 @@
+"""
+Подсказки для поиска по каталогу из памяти процесса.
+
+Индекс — два отсортированных массива строк «название вид» (нижний регистр,
+ё → е): в первом строки целиком, во втором — хвосты, начинающиеся с
+каждого следующего слова («фуджи» находит «яблоко фуджи»). Поиск префикса —
+bisect и короткий проход вперёд, без обращения к БД. Индекс перестраивается
+одним запросом, когда меняется версия каталога (см. caching.py).
+"""
+import threading
+from bisect import bisect_left
+
+from .caching import catalog_version
+from .models import Product
+from .search import normalize
+
+LIMIT = 10
+
+
+class PrefixIndex:
+    def __init__(self, products):
+        # products: [(id, name, kind, slug)]
+        self.products = products
+        full, words = [], []
+        for i, (_, name, kind, _) in enumerate(products):
+            text = normalize(f"{name} {kind}")
+            full.append((text, i))
+            pos = text.find(" ")
+            while pos != -1:
+                words.append((text[pos + 1:], i))
+                pos = text.find(" ", pos + 1)
+        full.sort()
+        words.sort()
+        self.full = full
+        self.words = words
+
+    @staticmethod
+    def _scan(entries, prefix, limit, seen, out):
+        i = bisect_left(entries, (prefix,))
+        while i < len(entries) and len(out) < limit:
+            key, idx = entries[i]
+            if not key.startswith(prefix):
+                break
+            if idx not in seen:
+                seen.add(idx)
+                out.append(idx)
+            i += 1
+
+    def lookup(self, query, limit=LIMIT):
+        """Сначала совпадения с начала названия, затем — с начала любого слова."""
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        seen, out = set(), []
+        self._scan(self.full, prefix, limit, seen, out)
+        self._scan(self.words, prefix, limit, seen, out)
+        return [self.products[i] for i in out]
+
+
+_lock = threading.Lock()
+_index = None
+_version = None
+
+
+def get_index():
+    global _index, _version
+    version = catalog_version()
+    if _index is None or _version != version:
+        with _lock:
+            if _index is None or _version != version:
+                rows = list(Product.objects.values_list("id", "name", "kind", "slug"))
+                _index, _version = PrefixIndex(rows), version
+    return _index
+
+
+def suggest(query, limit=LIMIT):
+    return [
+        {"id": pk, "name": name, "kind": kind, "slug": slug}
+        for pk, name, kind, slug in get_index().lookup(query, limit)
+    ]
@@ -0,0 +1,65 @@
+"""
+Общая обвязка команд-замеров (bench_catalog, bench_leaderboard, bench_feed).
+
+BenchCommand генерирует данные и замеряет сценарии внутри одной транзакции,
+которая в конце откатывается: в базе после прогона ничего не остаётся.
+Подкласс определяет _seed(**options) и _run(); в _run пригодятся _scenarios
+(таблица медиан по --repeat повторам) и _plans (EXPLAIN запросов).
+"""
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+
+class Rollback(Exception):
+    pass
+
+
+class BenchCommand(BaseCommand):
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--seed", type=int, default=400)
+
+    def handle(self, *args, **options):
+        self.repeat = options["repeat"]
+        random.seed(options["seed"])
+        try:
+            with transaction.atomic():
+                self._seed(**options)
+                self._run()
+                raise Rollback
+        except Rollback:
+            pass
+
+    def _seed(self, **options):
+        raise NotImplementedError
+
+    def _run(self):
+        raise NotImplementedError
+
+    def _analyze(self):
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def _time(self, fn):
+        samples = []
+        for _ in range(self.repeat):
+            t = time.perf_counter()
+            fn()
+            samples.append((time.perf_counter() - t) * 1000)
+        return statistics.median(samples)
+
+    def _scenarios(self, scenarios):
+        """Таблица «сценарий — медиана, мс» по списку [(название, функция)]."""
+        width = max(len(name) for name, _ in scenarios)
+        self.stdout.write(f"{'сценарий'.ljust(width)}  медиана, мс")
+        for name, fn in scenarios:
+            self.stdout.write(f"{name.ljust(width)}  {self._time(fn):8.2f}")
+
+    def _plans(self, plans):
+        self.stdout.write("\nПланы:")
+        for name, qs in plans:
+            self.stdout.write(f"-- {name}\n{qs.explain()}")
@@ -0,0 +1,75 @@
+"""
+Версионированный кэш каталога.
+
+Каталог меняется редко (одобрение заявки, админка), поэтому всё, что из
+него читается — меню категорий, страницы списка, карточки продуктов, —
+кэшируется под ключами с номером «версии каталога». Сигналы (signals.py)
+увеличивают версию при любом изменении Product, Category и связей
+Product.categories; старые ключи просто перестают читаться и истекают
+по таймауту.
+
+get_version/bump_version — те же версии под любым ключом; ими же
+версионируются кэши дневника (diary/nutrition.py) и подписок (social/graph.py).
+"""
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+VERSION_KEY = "catalog:version"
+TIMEOUT = 60 * 60
+
+
+def _fresh_version():
+    # метка времени, а не 1: если ключ версии вытеснили из кэша,
+    # новая версия не совпадёт ни с одной из старых
+    return time.time_ns() // 1000
+
+
+def get_version(key):
+    """Текущая версия под ключом key (заводится при первом чтении)."""
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _fresh_version(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(*keys):
+    """Сдвинуть версии под ключами keys после коммита текущей транзакции."""
+    def _bump():
+        for key in keys:
+            try:
+                cache.incr(key)
+            except ValueError:
+                cache.set(key, _fresh_version(), None)
+    transaction.on_commit(_bump)
+
+
+def catalog_version():
+    return get_version(VERSION_KEY)
+
+
+def bump_catalog_version():
+    """Сбросить кэш каталога после коммита текущей транзакции."""
+    bump_version(VERSION_KEY)
+
+
+def catalog_key(*parts):
+    digest = hashlib.md5(":".join(str(p) for p in parts).encode()).hexdigest()
+    return f"catalog:{catalog_version()}:{digest}"
+
+
+def cached(key_parts, compute, timeout=TIMEOUT):
+    """
+    Значение из кэша каталога или compute() с сохранением.
+    Ключ берётся до чтения из БД, поэтому изменение каталога во время
+    compute() не оставит устаревших данных под новой версией.
+    """
+    key = catalog_key(*key_parts)
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        cache.set(key, value, timeout)
+    return value
@@ -0,0 +1,80 @@
+import random
+import time
+from decimal import Decimal
+
+from django.db import connection
+
+from products.bench import BenchCommand
+from products.models import Category, Product
+from products.pagination import encode_cursor
+from products.search import build_search_text
+from products.views import _catalog_page
+
+WORDS = ["Яблоко", "Груша", "Слива", "Морковь", "Свёкла", "Капуста", "Фасоль", "Чечевица",
+         "Гречка", "Овёс", "Сыр", "Творог", "Кефир", "Форель", "Треска", "Миндаль", "Фундук",
+         "Индейка", "Говядина", "Тыква", "Кабачок", "Шпинат", "Укроп", "Киноа", "Булгур"]
+
+
+class Command(BenchCommand):
+    help = (
+        "Замеры запросов каталога на сгенерированных данных. "
+        "Всё выполняется в транзакции, которая в конце откатывается."
+    )
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument("--products", type=int, default=100_000)
+
+    def _seed(self, **options):
+        n = options["products"]
+        started = time.monotonic()
+        cats = [Category(name=f"bench-{w}", slug=f"bench-{i}") for i, w in enumerate(WORDS[:10])]
+        for c in cats:
+            c.save()
+        Link = Product.categories.through
+        batch = 5000
+        for start in range(0, n, batch):
+            objs = []
+            for i in range(start, min(start + batch, n)):
+                name, kind = f"{random.choice(WORDS)} {i}", random.choice(["", "сорт А", "сорт Б"])
+                objs.append(Product(
+                    name=name, kind=kind, slug=f"bench-{i}", search_text=build_search_text(name, kind),
+                    kcal=Decimal(random.randint(0, 90000)) / 100,
+                    proteins=Decimal(random.randint(0, 4000)) / 100,
+                    fats=Decimal(random.randint(0, 6000)) / 100,
+                    carbs=Decimal(random.randint(0, 8000)) / 100,
+                ))
+            Product.objects.bulk_create(objs)
+            Link.objects.bulk_create(
+                [Link(product_id=p.pk, category_id=random.choice(cats).pk) for p in objs if p.pk]
+            )
+        self._analyze()
+        self.stdout.write(f"Сгенерировано {n} продуктов за {time.monotonic() - started:.1f} с "
+                          f"({connection.vendor}).")
+
+    def _run(self):
+        offset = Product.objects.count() * 9 // 10
+        cursor = encode_cursor(Product.objects.order_by("name", "kind", "id")[offset])
+
+        def page(q="", cat="", filters=None, sort="", page="", after=""):
+            return lambda: list(_catalog_page(q, cat, filters or {}, sort, page, after, ""))
+
+        scenarios = [
+            ("каталог, стр. 1", page()),
+            ("каталог, курсор на 90%", page(after=cursor)),
+            ("каталог, OFFSET на 90% (как было)", lambda: list(
+                Product.objects.order_by("name", "kind")[offset:offset + 12])),
+            ("ккал 100–200, сорт. по ккал", page(filters={"kcal__gte": 100, "kcal__lte": 200}, sort="kcal")),
+            ("белки ≥ 30, сорт. белки ↓", page(filters={"proteins__gte": 30}, sort="-proteins")),
+            ("ккал ≤ 150 + жиры ≤ 5", page(filters={"kcal__lte": 150, "fats__lte": 5})),
+            ("ккал ≤ 300 + категория", page(cat="bench-3", filters={"kcal__lte": 300})),
+            ("поиск «гречка» + ккал ≤ 300", page(q="гречка", filters={"kcal__lte": 300})),
+            ("поиск «гречка», сорт. белки ↓", page(q="гречка", sort="-proteins")),
+        ]
+        self._scenarios(scenarios)
+
+        self._plans([
+            ("ккал 100–200", Product.objects.filter(kcal__gte=100, kcal__lte=200).order_by("kcal", "id")[:13]),
+            ("белки ≥ 30 ↓", Product.objects.filter(proteins__gte=30).order_by("-proteins", "-id")[:13]),
+        ])
+
@@ -0,0 +1,59 @@
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db.models import F, Q
+
+from products.models import Product
+from products.thumbnails import make_pool, render_thumbnails, store_thumbnails
+
+
+class Command(BaseCommand):
+    help = "Нарезает миниатюры для фото продуктов, у которых их ещё нет (параллельно)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+        parser.add_argument("--force", action="store_true", help="Пересобрать и готовые миниатюры")
+
+    def handle(self, *args, **options):
+        workers = max(1, options["workers"])
+        qs = Product.objects.exclude(photo="").exclude(photo__isnull=True)
+        if not options["force"]:
+            qs = qs.filter(~Q(thumb_source=F("photo")) | Q(thumb_hash=""))
+
+        done = failed = 0
+        started = time.monotonic()
+        pending = {}
+        with make_pool(workers) as pool:
+            for pk, source in qs.values_list("id", "photo").iterator(chunk_size=500):
+                # не держим в памяти больше пары файлов на процесс
+                if len(pending) >= workers * 2:
+                    finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    d, f = self._collect(finished, pending)
+                    done, failed = done + d, failed + f
+                try:
+                    with default_storage.open(source, "rb") as fh:
+                        pending[pool.submit(render_thumbnails, fh.read())] = (pk, source)
+                except OSError as e:
+                    self.stderr.write(self.style.WARNING(f"{source}: {e}"))
+                    failed += 1
+            d, f = self._collect(wait(pending).done, pending)
+            done, failed = done + d, failed + f
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Готово: {done} фото за {time.monotonic() - started:.1f} с, ошибок: {failed}."
+        ))
+
+    def _collect(self, finished, pending):
+        done = failed = 0
+        for future in finished:
+            pk, source = pending.pop(future)
+            try:
+                store_thumbnails(pk, source, future.result())
+                done += 1
+            except Exception as e:
+                self.stderr.write(self.style.WARNING(f"{source}: {e}"))
+                failed += 1
+        return done, failed
@@ -0,0 +1,43 @@
+"""
+Дерево категорий для меню каталога.
+
+Дерево строится из материализованных путей одним запросом, а готовый
+HTML кэшируется до следующего изменения каталога (см. caching.py).
+"""
+from django.utils.html import escape, format_html_join
+
+from .caching import cached
+from .models import Category
+
+
+def category_tree():
+    """Плоский список категорий в порядке обхода дерева (по имени внутри уровня)."""
+    rows = list(Category.objects.only("id", "name", "slug", "parent_id", "depth"))
+    children = {}
+    for c in rows:
+        children.setdefault(c.parent_id, []).append(c)
+
+    result = []
+    stack = sorted(children.get(None, []), key=lambda c: c.name, reverse=True)
+    while stack:
+        c = stack.pop()
+        result.append(c)
+        stack.extend(sorted(children.get(c.id, []), key=lambda c: c.name, reverse=True))
+    return result
+
+
+def category_options_html():
+    return cached(("category_menu",), lambda: format_html_join(
+        "\n", '<option value="{}">{}{}</option>',
+        ((c.slug, "\u00a0\u00a0" * c.depth, c.name) for c in category_tree()),
+    ))
+
+
+def render_category_options(current_slug=""):
+    """Готовые <option> с отмеченной текущей категорией."""
+    html = category_options_html()
+    if current_slug:
+        attr = f'value="{escape(current_slug)}"'
+        html = html.replace(attr, f"{attr} selected", 1)
+    return html
+
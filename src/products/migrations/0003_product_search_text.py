@@ -0,0 +1,52 @@
+# Generated by Django 5.2.6 on 2026-10-18 11:48
+
+from django.db import migrations, models
+
+from products.search import (build_search_text, install_sqlite_fts, postgres_indexes,
+                             uninstall_sqlite_fts)
+
+
+def fill_search_text(apps, schema_editor):
+    Product = apps.get_model("products", "Product")
+    rows = list(Product.objects.only("id", "name", "kind"))
+    for p in rows:
+        p.search_text = build_search_text(p.name, p.kind)
+    Product.objects.bulk_update(rows, ["search_text"], batch_size=1000)
+
+
+def create_search_indexes(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == "postgresql":
+        Product = apps.get_model("products", "Product")
+        schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        for index in postgres_indexes():
+            schema_editor.add_index(Product, index)
+    elif connection.vendor == "sqlite":
+        install_sqlite_fts(connection)
+
+
+def drop_search_indexes(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == "postgresql":
+        Product = apps.get_model("products", "Product")
+        for index in postgres_indexes():
+            schema_editor.remove_index(Product, index)
+    elif connection.vendor == "sqlite":
+        uninstall_sqlite_fts(connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0002_alter_product_kind_alter_product_name_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='search_text',
+            field=models.CharField(blank=True, editable=False, max_length=330),
+        ),
+        migrations.RunPython(fill_search_text, migrations.RunPython.noop),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.6 on 2026-10-18 11:51
+
+from django.db import migrations, models
+
+
+def fill_paths(apps, schema_editor):
+    Category = apps.get_model("products", "Category")
+    rows = list(Category.objects.only("id", "parent_id"))
+    children = {}
+    for c in rows:
+        children.setdefault(c.parent_id, []).append(c)
+
+    # обход от корней; узел из цикла (если вдруг есть) отцепляем и делаем корнем
+    seen = set()
+    stack = [(c, "", 0) for c in children.get(None, [])]
+    while stack or len(seen) < len(rows):
+        if not stack:
+            orphan = next(c for c in rows if c.id not in seen)
+            orphan.parent_id = None
+            stack.append((orphan, "", 0))
+        c, prefix, depth = stack.pop()
+        if c.id in seen:
+            continue
+        seen.add(c.id)
+        c.path, c.depth = f"{prefix}{c.id}/", depth
+        stack.extend((child, c.path, depth + 1) for child in children.get(c.id, []))
+    Category.objects.bulk_update(rows, ["parent", "path", "depth"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0003_product_search_text'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='path',
+            field=models.CharField(blank=True, editable=False, max_length=255),
+        ),
+        migrations.RunPython(fill_paths, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='category',
+            index=models.Index(fields=['path'], name='category_path_idx', opclasses=['varchar_pattern_ops']),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-18 11:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_category_path'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='thumb_hash',
+            field=models.CharField(blank=True, editable=False, max_length=40),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='thumb_source',
+            field=models.CharField(blank=True, editable=False, max_length=100),
+        ),
+    ]
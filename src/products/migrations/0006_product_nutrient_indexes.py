@@ -0,0 +1,29 @@
+# Generated by Django 5.2.6 on 2026-10-18 11:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_product_thumbnails'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['kcal', 'id'], name='product_kcal_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['proteins', 'id'], name='product_proteins_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['fats', 'id'], name='product_fats_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['carbs', 'id'], name='product_carbs_idx'),
+        ),
+    ]
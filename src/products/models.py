@@ -1,37 +1,91 @@
+from django.core.exceptions import ValidationError
 from django.db import models
+from django.db.models import F, Value
+from django.db.models.functions import Concat, Substr
 from django.utils.text import slugify
 
+from .search import build_search_text
+
 class Category(models.Model):
     name = models.CharField("Название", max_length=120, unique=True)
     slug = models.SlugField("Слаг", unique=True, blank=True)
     parent = models.ForeignKey("self", verbose_name="Родитель",
                                null=True, blank=True, on_delete=models.SET_NULL)
+    # материализованный путь "1/5/12/": категория и все её потомки —
+    # это path__startswith=<path>, один проход по индексу
+    path = models.CharField(max_length=255, blank=True, editable=False)
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
 
     class Meta:
         verbose_name = "Категория"
         verbose_name_plural = "Категории"
         ordering = ["name"]
+        indexes = [
+            # varchar_pattern_ops — чтобы LIKE 'prefix%' шёл по индексу в PostgreSQL
+            models.Index(fields=["path"], name="category_path_idx", opclasses=["varchar_pattern_ops"]),
+        ]
+
+    def clean(self):
+        if self.parent_id and self.pk and self.parent.path.startswith(self.path or "-"):
+            raise ValidationError({"parent": "Категория не может быть вложена сама в себя."})
 
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.name, allow_unicode=True)
+        prefix = self.parent.path if self.parent_id else ""
+        if self.pk is None:
+            self.depth = self.parent.depth + 1 if self.parent_id else 0
+            super().save(*args, **kwargs)
+            # id известен только после вставки: путь дописываем UPDATE'ом,
+            # а не вторым save() — иначе post_save пришёл бы дважды
+            self.path = f"{prefix}{self.pk}/"
+            Category.objects.using(self._state.db).filter(pk=self.pk).update(path=self.path)
+            return
+        if kwargs.get("update_fields") is not None:
+            kwargs["update_fields"] = {*kwargs["update_fields"], "path", "depth"}
+        old_path, old_depth = self.path, self.depth
+        if prefix.startswith(old_path or "-"):
+            raise ValueError("Категория не может быть вложена сама в себя.")
+        self.path = f"{prefix}{self.pk}/"
+        self.depth = self.parent.depth + 1 if self.parent_id else 0
         super().save(*args, **kwargs)
+        if old_path and old_path != self.path:
+            # переносим всё поддерево одним UPDATE
+            Category.objects.filter(path__startswith=old_path).exclude(pk=self.pk).update(
+                path=Concat(Value(self.path), Substr("path", len(old_path) + 1)),
+                depth=F("depth") + (self.depth - old_depth),
+            )
+
+    def subtree(self):
+        """Эта категория и все её потомки."""
+        return Category.objects.filter(path__startswith=self.path)
 
     def __str__(self):
         return self.name
 
 
+# пищевая ценность на 100 г: фильтры и сортировки каталога, импорт, итоги дневника
+NUTRIENTS = ("kcal", "proteins", "fats", "carbs")
+
+
 class Product(models.Model):
     name = models.CharField("Название", max_length=200)
     slug = models.SlugField("Слаг", unique=True, blank=True)
     kind = models.CharField("Сорт / вид", max_length=120, blank=True)
     photo = models.ImageField("Фото", upload_to="products/", blank=True, null=True)
+    # миниатюры (products/thumbnails.py): хэш содержимого и для какого файла нарезаны
+    thumb_hash = models.CharField(max_length=40, blank=True, editable=False)
+    thumb_source = models.CharField(max_length=100, blank=True, editable=False)
     kcal = models.DecimalField("Калории (ккал/100г)", max_digits=6, decimal_places=2, default=0)
     proteins = models.DecimalField("Белки (г/100г)", max_digits=6, decimal_places=2, default=0)
     fats = models.DecimalField("Жиры (г/100г)", max_digits=6, decimal_places=2, default=0)
     carbs = models.DecimalField("Углеводы (г/100г)", max_digits=6, decimal_places=2, default=0)
     categories = models.ManyToManyField("products.Category", verbose_name="Категории", blank=True, related_name="products")
     created_at = models.DateTimeField(auto_now_add=True)
+    # когда менялась карточка продукта (включая категории и миниатюры) — для Last-Modified
+    updated_at = models.DateTimeField(auto_now=True)
+    # нормализованное «название вид» для поиска (см. products/search.py)
+    search_text = models.CharField(max_length=330, blank=True, editable=False)
 
     class Meta:
         verbose_name = "Продукт"
@@ -40,11 +94,22 @@ class Product(models.Model):
         constraints = [
             models.UniqueConstraint(fields=["name", "kind"], name="uniq_product_name_kind"),
         ]
+        # фильтр по диапазону и сортировка по нутриенту (с id — для курсора)
+        indexes = [
+            models.Index(fields=["kcal", "id"], name="product_kcal_idx"),
+            models.Index(fields=["proteins", "id"], name="product_proteins_idx"),
+            models.Index(fields=["fats", "id"], name="product_fats_idx"),
+            models.Index(fields=["carbs", "id"], name="product_carbs_idx"),
+        ]
 
     def save(self, *args, **kwargs):
         if not self.slug:
             base = self.name if not self.kind else f"{self.name}-{self.kind}"
             self.slug = slugify(base, allow_unicode=True)
+        self.search_text = build_search_text(self.name, self.kind)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and {"name", "kind"} & set(update_fields):
+            kwargs["update_fields"] = {*update_fields, "search_text"}
         super().save(*args, **kwargs)
 
     def __str__(self):
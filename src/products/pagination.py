@@ -0,0 +1,145 @@
+"""
+Курсорная (keyset) пагинация каталога.
+
+Вместо OFFSET страница начинается «после» последней показанной строки
+по ключу сортировки — по умолчанию (name, kind, id), — поэтому 500-я
+страница стоит столько же, сколько первая: это один проход по индексу
+(uniq_product_name_kind или индексу нутриента, см. Product.Meta).
+"""
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db import connections
+from django.db.models import Q
+
+KEY = ("name", "kind", "id")
+
+
+def _field(f):
+    return f.lstrip("-")
+
+
+def encode_cursor(obj, key=KEY):
+    raw = json.dumps([getattr(obj, _field(f)) for f in key], ensure_ascii=False, default=str)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token, key=KEY):
+    """Значения полей ключа или None, если курсор битый."""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(values, list) or len(values) != len(key):
+        return None
+    return values
+
+
+def _seek(key, values, forward=True):
+    """
+    Строки строго после (forward) или до курсора в порядке key:
+    (a > x) OR (a = x AND b > y) OR ... с учётом направления каждого поля.
+    """
+    q = Q()
+    for i, f in enumerate(key):
+        op = "gt" if forward != f.startswith("-") else "lt"
+        equal = {_field(k): v for k, v in zip(key[:i], values[:i])}
+        q |= Q(**equal, **{f"{_field(f)}__{op}": values[i]})
+    # избыточное условие на первое поле даёт планировщику диапазон по индексу,
+    # иначе OR-цепочку он читает целиком
+    op = "gte" if forward != key[0].startswith("-") else "lte"
+    return Q(**{f"{_field(key[0])}__{op}": values[0]}) & q
+
+
+def _reverse(key):
+    return tuple(_field(f) if f.startswith("-") else f"-{f}" for f in key)
+
+
+class KeysetPage:
+    """Страница с тем же интерфейсом для шаблона, что и у Page, но без номера."""
+
+    def __init__(self, object_list, has_next, has_previous, key=KEY):
+        self.object_list = object_list
+        self._has_next = has_next
+        self._has_previous = has_previous
+        self.key = key
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self._has_next and bool(self.object_list)
+
+    def has_previous(self):
+        return self._has_previous and bool(self.object_list)
+
+    @property
+    def next_cursor(self):
+        return encode_cursor(self.object_list[-1], self.key) if self.object_list else ""
+
+    @property
+    def previous_cursor(self):
+        return encode_cursor(self.object_list[0], self.key) if self.object_list else ""
+
+
+def _filter_seek(qs, key, token, forward):
+    values = decode_cursor(token, key) if token else None
+    if values is None:
+        return qs, False
+    try:
+        return qs.filter(_seek(key, values, forward)), True
+    except (ValidationError, ValueError, TypeError):
+        # значение не подходит к типу поля — курсор подделан или устарел
+        return qs, False
+
+
+def keyset_page(qs, per_page, after=None, before=None, key=KEY):
+    """
+    Одна страница qs в порядке key (последнее поле — уникальное, обычно id).
+    after — курсор «следующей» страницы, before — «предыдущей».
+    Берём на одну строку больше, чтобы узнать, есть ли продолжение.
+    """
+    back_qs, ok = _filter_seek(qs, key, before, forward=False)
+    if ok:
+        rows = list(back_qs.order_by(*_reverse(key))[:per_page + 1])
+        has_more = len(rows) > per_page
+        rows = rows[:per_page][::-1]
+        return KeysetPage(rows, has_next=True, has_previous=has_more, key=key)
+
+    qs, ok = _filter_seek(qs, key, after, forward=True)
+    rows = list(qs.order_by(*key)[:per_page + 1])
+    return KeysetPage(rows[:per_page], has_next=len(rows) > per_page, has_previous=ok, key=key)
+
+
+def frozen_page(paginator, number):
+    """
+    Страница Paginator без ссылки на исходный QuerySet — её можно положить
+    в кэш (при pickle QuerySet выполнился бы целиком).
+    """
+    page = paginator.get_page(number)
+    page.object_list = list(page.object_list)
+    paginator.num_pages  # count и num_pages считаются и запоминаются здесь
+    paginator.object_list = ()
+    return page
+
+
+def estimated_count(model, using="default"):
+    """
+    Приблизительное число строк таблицы без COUNT(*).
+    На PostgreSQL — статистика планировщика (pg_class.reltuples),
+    иначе (или если ANALYZE ещё не запускался) — обычный count().
+    """
+    connection = connections[using]
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                           [model._meta.db_table])
+            row = cursor.fetchone()
+        if row and row[0] >= 0:
+            return row[0]
+    return model._default_manager.using(using).count()
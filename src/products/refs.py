@@ -0,0 +1,57 @@
+"""
+Краткие сведения о продуктах (id, слаг, название, вид) из памяти процесса.
+
+Лента и другие страницы, которые ссылаются на продукты по id, собирают id со
+всей страницы и получают сведения одним вызовом product_refs: что есть в
+кэше воркера — без БД, остальное — одним запросом in_bulk. Кэш сбрасывается
+целиком при смене версии каталога (caching.py), поэтому переименованный
+продукт сразу показывается с новым названием. Размер ограничен: при
+переполнении вытесняются давно не спрошенные.
+"""
+import threading
+from collections import OrderedDict, namedtuple
+
+from .caching import catalog_version
+from .models import Product
+
+MAX_SIZE = 20_000
+
+ProductRef = namedtuple("ProductRef", "id slug name kind")
+
+_lock = threading.Lock()
+_refs = OrderedDict()
+_version = None
+
+
+def product_refs(ids):
+    """{id: ProductRef} для существующих продуктов из ids."""
+    global _version
+    ids = {int(pk) for pk in ids if pk is not None}
+    if not ids:
+        return {}
+    version = catalog_version()
+    found = {}
+    with _lock:
+        if _version != version:
+            _refs.clear()
+            _version = version
+        for pk in ids:
+            ref = _refs.get(pk)
+            if ref is not None:
+                _refs.move_to_end(pk)
+                found[pk] = ref
+    missing = ids - found.keys()
+    if missing:
+        loaded = {
+            pk: ProductRef(pk, slug, name, kind)
+            for pk, slug, name, kind in Product.objects.filter(pk__in=missing)
+            .values_list("id", "slug", "name", "kind")
+        }
+        found.update(loaded)
+        with _lock:
+            # версия могла смениться, пока читали, — тогда в кэш не кладём
+            if _version == version:
+                _refs.update(loaded)
+                while len(_refs) > MAX_SIZE:
+                    _refs.popitem(last=False)
+    return found
@@ -0,0 +1,173 @@
+"""
+Поиск по каталогу продуктов.
+
+PostgreSQL: полнотекстовый поиск с русской морфологией (GIN по to_tsvector)
+плюс нечёткое совпадение через pg_trgm (GIN gin_trgm_ops) — опечатки
+прощает индекс, а не перебор строк.
+SQLite (USE_SQLITE=1): FTS5-таблица с триграммным токенайзером,
+синхронизируемая триггерами.
+
+Ищем по Product.search_text — нормализованной строке «название вид»
+(нижний регистр, ё → е), которую заполняет Product.save.
+"""
+import re
+
+from django.db import connections
+from django.db.models.signals import post_migrate
+from django.db.models import FloatField, Q, Value
+
+SEARCH_CONFIG = "russian"
+FTS_TABLE = "products_product_fts"
+# триграммный токенайзер FTS5 не находит строки короче трёх символов
+FTS_MIN_LEN = 3
+
+_WORD_RE = re.compile(r"[^\W_]+")
+
+
+def normalize(text):
+    """Нижний регистр, ё → е, одиночные пробелы."""
+    text = (text or "").lower().replace("ё", "е")
+    return " ".join(text.split())
+
+
+def tokenize(text):
+    """Слова текста: последовательности букв и цифр, без пунктуации."""
+    return _WORD_RE.findall(text)
+
+
+def build_search_text(name, kind):
+    return normalize(f"{name} {kind}")
+
+
+def search_vector():
+    from django.contrib.postgres.search import SearchVector
+    return SearchVector("search_text", config=SEARCH_CONFIG)
+
+
+def postgres_indexes():
+    """
+    Индексы для PostgreSQL. Их создаёт миграция, а запрос строит то же
+    выражение через search_vector(), поэтому планировщик их подхватывает.
+    """
+    from django.contrib.postgres.indexes import GinIndex, OpClass
+    return [
+        GinIndex(search_vector(), name="product_search_fts_idx"),
+        GinIndex(OpClass("search_text", name="gin_trgm_ops"), name="product_search_trgm_idx"),
+    ]
+
+
+def install_sqlite_fts(connection, fts_table=FTS_TABLE, source_table="products_product"):
+    """
+    Создаёт FTS5-таблицу над source_table.search_text и триггеры, если их нет
+    (идемпотентно). SQLite пересоздаёт таблицу при части ALTER-ов и теряет
+    триггеры, поэтому вызывается и из миграции, и после каждого migrate.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT count(*) FROM sqlite_master WHERE type = 'trigger' AND name LIKE %s",
+            [f"{fts_table}_%"],
+        )
+        if cursor.fetchone()[0] == 3:
+            return
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts_table} USING fts5("
+            f"search_text, content='{source_table}', content_rowid='id', tokenize='trigram')"
+        )
+        cursor.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {fts_table}_ai AFTER INSERT ON {source_table} BEGIN "
+            f"INSERT INTO {fts_table}(rowid, search_text) VALUES (new.id, new.search_text); END"
+        )
+        cursor.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {fts_table}_ad AFTER DELETE ON {source_table} BEGIN "
+            f"INSERT INTO {fts_table}({fts_table}, rowid, search_text) "
+            f"VALUES ('delete', old.id, old.search_text); END"
+        )
+        cursor.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {fts_table}_au AFTER UPDATE ON {source_table} BEGIN "
+            f"INSERT INTO {fts_table}({fts_table}, rowid, search_text) "
+            f"VALUES ('delete', old.id, old.search_text); "
+            f"INSERT INTO {fts_table}(rowid, search_text) VALUES (new.id, new.search_text); END"
+        )
+        # триггеров не было — индекс мог разойтись с таблицей
+        cursor.execute(f"INSERT INTO {fts_table}({fts_table}) VALUES ('rebuild')")
+
+
+def connect_sqlite_fts(app_config, fts_table, install):
+    """
+    После каждого migrate приложения app_config вызывать install(connection),
+    если база — SQLite и FTS-таблица fts_table уже есть.
+    """
+    def ensure(sender, using, **kwargs):
+        connection = connections[using]
+        # таблицу создаёт миграция; здесь только восстанавливаем триггеры
+        if connection.vendor == "sqlite" and fts_table in connection.introspection.table_names():
+            install(connection)
+
+    post_migrate.connect(ensure, sender=app_config, weak=False)
+
+
+def uninstall_sqlite_fts(connection, fts_table=FTS_TABLE):
+    with connection.cursor() as cursor:
+        for suffix in ("ai", "ad", "au"):
+            cursor.execute(f"DROP TRIGGER IF EXISTS {fts_table}_{suffix}")
+        cursor.execute(f"DROP TABLE IF EXISTS {fts_table}")
+
+
+def fts_filter(qs, terms, fts_table=FTS_TABLE):
+    """
+    qs, соединённый с FTS5-таблицей по MATCH всех terms, с аннотацией rank
+    (больше — релевантнее). Настоящий JOIN: bm25 считается за один проход
+    MATCH (коррелированный подзапрос повторял бы MATCH для каждой строки).
+    """
+    match = " ".join(f'"{w}"' for w in terms)
+    table = qs.model._meta.db_table
+    return qs.extra(
+        select={"rank": f"-bm25({fts_table})"},  # bm25 отрицателен: меньше — лучше
+        tables=[fts_table],
+        where=[f"{fts_table}.rowid = {table}.id", f"{fts_table} MATCH %s"],
+        params=[match],
+    )
+
+
+def search_products(qs, q):
+    """
+    Отфильтровать qs по запросу q и отсортировать по релевантности.
+    Добавляет аннотацию rank (больше — релевантнее).
+    """
+    q = normalize(q)
+    words = tokenize(q)
+    if not words:
+        return qs.none()
+
+    vendor = connections[qs.db].vendor
+    if vendor == "postgresql":
+        return _search_postgres(qs, q, words)
+    if vendor == "sqlite":
+        return _search_sqlite(qs, q, words)
+    return (qs.filter(search_text__contains=q)
+              .annotate(rank=Value(0.0, output_field=FloatField()))
+              .order_by("name", "kind"))
+
+
+def _search_postgres(qs, q, words):
+    from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramSimilarity
+
+    # префиксный поиск по каждому слову — для подсказок «на лету»
+    tsquery = SearchQuery(" & ".join(f"{w}:*" for w in words),
+                          config=SEARCH_CONFIG, search_type="raw")
+    vector = search_vector()
+    return (qs.alias(search=vector)
+              .filter(Q(search=tsquery) | Q(search_text__trigram_similar=q))
+              .annotate(rank=SearchRank(vector, tsquery) + TrigramSimilarity("search_text", q))
+              .order_by("-rank", "name", "kind"))
+
+
+def _search_sqlite(qs, q, words):
+    terms = [w for w in words if len(w) >= FTS_MIN_LEN]
+    if not terms:
+        # короткий запрос — с начала любого слова, как в поиске пользователей
+        return (qs.filter(Q(search_text__startswith=q) | Q(search_text__contains=f" {q}"))
+                  .annotate(rank=Value(0.0, output_field=FloatField()))
+                  .order_by("name", "kind"))
+
+    return fts_filter(qs, terms).order_by("-rank", "name", "kind")
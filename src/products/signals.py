@@ -0,0 +1,60 @@
+from django.db.models import F
+from django.db.models.functions import Substr
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .caching import bump_catalog_version
+from .models import Category, Product
+from .thumbnails import schedule_thumbnails
+
+
+@receiver(post_delete, sender=Category)
+def category_deleted(sender, instance, **kwargs):
+    """
+    Дети удалённой категории (parent → NULL) становятся корнями:
+    срезаем префикс пути у всего поддерева.
+    """
+    if instance.path:
+        (Category.objects
+         .filter(path__startswith=instance.path)
+         .exclude(pk=instance.pk)
+         .update(path=Substr("path", len(instance.path) + 1),
+                 depth=F("depth") - (instance.depth + 1)))
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(m2m_changed, sender=Product.categories.through)
+def catalog_changed(sender, **kwargs):
+    if kwargs.get("action", "post_").startswith("post_"):
+        bump_catalog_version()
+
+
+@receiver(post_save, sender=Category)
+@receiver(pre_delete, sender=Category)
+def category_touched(sender, instance, created=False, **kwargs):
+    """Название категории есть на странице продукта — сдвигаем их updated_at (Last-Modified)."""
+    if not created:
+        Product.objects.filter(categories=instance).update(updated_at=timezone.now())
+
+
+@receiver(m2m_changed, sender=Product.categories.through)
+def product_categories_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return
+    if not reverse:
+        Product.objects.filter(pk=instance.pk).update(updated_at=timezone.now())
+    elif action == "pre_clear":
+        # после clear() не узнать, какие продукты были в категории
+        Product.objects.filter(categories=instance).update(updated_at=timezone.now())
+    elif pk_set:
+        Product.objects.filter(pk__in=pk_set).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Product)
+def product_photo_changed(sender, instance, **kwargs):
+    if instance.photo and instance.thumb_source != instance.photo.name:
+        schedule_thumbnails(instance)
@@ -0,0 +1,38 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+from django.utils.safestring import mark_safe
+
+from products.menu import render_category_options
+from products.thumbnails import picture_sources
+
+register = template.Library()
+
+
+@register.simple_tag
+def category_options(current_slug=""):
+    """
+    Вложенный список категорий для <select> (из кэша).
+    Использование: {% category_options current_cat %}
+    """
+    return mark_safe(render_category_options(current_slug))
+
+
+@register.simple_tag
+def product_picture(product, sizes="100vw", **attrs):
+    """
+    <picture> с миниатюрами WebP/JPEG разных ширин; пока их нет — оригинал.
+    Использование: {% product_picture item sizes="33vw" class="card-img-top" %}
+    """
+    if not product.photo:
+        return ""
+    img_attrs = format_html_join("", ' {}="{}"', attrs.items())
+    sources = picture_sources(product)
+    if not sources:
+        return format_html('<img src="{}" alt="{}" loading="lazy"{}>', product.photo.url, product, img_attrs)
+    *extra, (fallback_mime, fallback_srcset) = sources
+    return format_html(
+        '<picture>{}<img src="{}" srcset="{}" sizes="{}" alt="{}" loading="lazy"{}></picture>',
+        format_html_join("", '<source type="{}" srcset="{}" sizes="{}">',
+                         ((mime, srcset, sizes) for mime, srcset in extra)),
+        product.photo.url, fallback_srcset, sizes, product, img_attrs,
+    )
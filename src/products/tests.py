@@ -1,3 +1,78 @@
+import io
+import tempfile
+
+from django.core.management import call_command
+from django.db.models.signals import post_save
 from django.test import TestCase
 
-# Create your tests here.
+from .models import Category, Product
+from .search import search_products
+
+
+class ImportProductsTests(TestCase):
+    def _import(self, text):
+        with tempfile.NamedTemporaryFile("w", suffix=".jsonl", encoding="utf-8") as f:
+            f.write(text)
+            f.flush()
+            out, err = io.StringIO(), io.StringIO()
+            call_command("import_products", f.name, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_jsonl_non_object_lines_are_row_errors(self):
+        out, err = self._import(
+            '[]\n1\n"x"\nnull\n{broken\n'
+            '{"name": "Яблоко", "kcal": 52, "categories": "Фрукты"}\n'
+        )
+        self.assertIn("пропущено 5", out)
+        for lineno in (1, 2, 3, 4):
+            self.assertIn(f"Строка {lineno}: ожидался объект JSON", err)
+        self.assertIn("Строка 5: неверный JSON", err)
+        product = Product.objects.get(name="Яблоко")
+        self.assertEqual([c.name for c in product.categories.all()], ["Фрукты"])
+
+
+class ProductSearchTextTests(TestCase):
+    def test_partial_save_refreshes_search_text(self):
+        product = Product.objects.create(name="Яблоко", kind="зелёное", slug="apple")
+        product.kind = "красное"
+        product.save(update_fields=["kind"])
+        product.refresh_from_db()
+        self.assertEqual(product.search_text, "яблоко красное")
+
+
+class CategorySaveTests(TestCase):
+    def test_create_sends_post_save_once_and_sets_path(self):
+        calls = []
+
+        def receiver(sender, instance, created, **kwargs):
+            calls.append(created)
+
+        post_save.connect(receiver, sender=Category)
+        try:
+            root = Category.objects.create(name="Фрукты")
+            child = Category.objects.create(name="Яблочные", parent=root)
+        finally:
+            post_save.disconnect(receiver, sender=Category)
+        self.assertEqual(calls, [True, True])
+        self.assertEqual(child.path, f"{root.pk}/{child.pk}/")
+        child.refresh_from_db()
+        self.assertEqual((child.path, child.depth), (f"{root.pk}/{child.pk}/", 1))
+
+    def test_move_rewrites_subtree(self):
+        a = Category.objects.create(name="A")
+        b = Category.objects.create(name="B", parent=a)
+        c = Category.objects.create(name="C", parent=b)
+        b.parent = None
+        b.save()
+        c.refresh_from_db()
+        self.assertEqual((c.path, c.depth), (f"{b.pk}/{c.pk}/", 1))
+
+
+class ShortQuerySearchTests(TestCase):
+    def test_short_query_matches_any_word_start(self):
+        for name, kind in [("Яблоко", ""), ("Сок", "яблочный"), ("Груша", "")]:
+            Product.objects.create(name=name, kind=kind, slug=f"short-{name}")
+        found = search_products(Product.objects.all(), "Я")
+        self.assertEqual({p.name for p in found}, {"Яблоко", "Сок"})
+        # середина слова — не совпадение
+        self.assertEqual(list(search_products(Product.objects.all(), "бл")), [])
@@ -0,0 +1,132 @@
+"""
+Миниатюры фото продуктов.
+
+Из Product.photo нарезаются копии нескольких ширин в WebP и JPEG и
+кладутся рядом с оригиналом: products/thumbs/<хэш содержимого>-<ширина>.<ext>.
+Имена зависят только от содержимого, поэтому файлы неизменяемы и их можно
+кэшировать навсегда. Нарезка нагружает CPU, поэтому идёт в пуле процессов
+после коммита сохранения продукта; шаблонный тег product_picture отдаёт
+<picture> с srcset, пока миниатюр нет — оригинал.
+
+render_thumbnails не трогает Django — его выполняют дочерние процессы,
+поэтому модели здесь импортируются только внутри функций.
+"""
+import hashlib
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from .caching import bump_catalog_version
+
+logger = logging.getLogger(__name__)
+
+WIDTHS = (240, 480, 960)
+# (формат Pillow, расширение, MIME, параметры сохранения)
+FORMATS = (
+    ("WEBP", "webp", "image/webp", {"quality": 80, "method": 4}),
+    ("JPEG", "jpg", "image/jpeg", {"quality": 82, "optimize": True, "progressive": True}),
+)
+THUMBS_DIR = "products/thumbs"
+
+_pool = None
+
+
+def thumb_name(digest, width, ext):
+    return f"{THUMBS_DIR}/{digest}-{width}.{ext}"
+
+
+def render_thumbnails(data):
+    """
+    bytes оригинала → (хэш, {(ширина, расширение): bytes}).
+    Больше оригинала не увеличиваем.
+    """
+    digest = hashlib.sha256(data).hexdigest()[:20]
+    with Image.open(BytesIO(data)) as img:
+        img = ImageOps.exif_transpose(img).convert("RGB")
+    files = {}
+    for width in WIDTHS:
+        copy = img.copy()
+        copy.thumbnail((width, width * 4), Image.Resampling.LANCZOS)
+        for fmt, ext, _, opts in FORMATS:
+            buf = BytesIO()
+            copy.save(buf, fmt, **opts)
+            files[width, ext] = buf.getvalue()
+    return digest, files
+
+
+def store_thumbnails(pk, source, result):
+    """Записать файлы и отметить продукт, если фото с тех пор не сменилось."""
+    from .models import Product
+
+    digest, files = result
+    for (width, ext), blob in files.items():
+        name = thumb_name(digest, width, ext)
+        if not default_storage.exists(name):
+            default_storage.save(name, ContentFile(blob))
+    # update() без сигналов — повторной нарезки не будет
+    updated = Product.objects.filter(pk=pk, photo=source).update(
+        thumb_hash=digest, thumb_source=source, updated_at=timezone.now())
+    if updated:
+        bump_catalog_version()
+
+
+def make_pool(workers):
+    # spawn, а не fork: веб-процесс многопоточный, а детям Django не нужен
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        _pool = make_pool(settings.THUMBNAIL_WORKERS)
+    return _pool
+
+
+def _done(pk, source, future):
+    # вызывается в служебном потоке пула — своё соединение с БД закрываем сами
+    try:
+        store_thumbnails(pk, source, future.result())
+    except Exception:
+        logger.exception("Не удалось сделать миниатюры для продукта %s", pk)
+    finally:
+        connection.close()
+
+
+def _submit(pk, source):
+    try:
+        with default_storage.open(source, "rb") as f:
+            data = f.read()
+    except OSError:
+        logger.exception("Не удалось прочитать фото %s", source)
+        return
+    if not settings.THUMBNAIL_WORKERS:
+        store_thumbnails(pk, source, render_thumbnails(data))
+        return
+    future = _get_pool().submit(render_thumbnails, data)
+    future.add_done_callback(partial(_done, pk, source))
+
+
+def schedule_thumbnails(product):
+    """Нарезать миниатюры для текущего фото продукта после коммита."""
+    pk, source = product.pk, product.photo.name
+    transaction.on_commit(lambda: _submit(pk, source))
+
+
+def picture_sources(product):
+    """[(MIME, srcset)] для готовых миниатюр или [] — тогда показываем оригинал."""
+    if not product.photo or product.thumb_source != product.photo.name or not product.thumb_hash:
+        return []
+    return [
+        (mime, ", ".join(f"{default_storage.url(thumb_name(product.thumb_hash, w, ext))} {w}w"
+                         for w in WIDTHS))
+        for _, ext, mime, _ in FORMATS
+    ]
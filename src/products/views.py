@@ -1,39 +1,235 @@
+import asyncio
+import hashlib
+from decimal import Decimal, InvalidOperation
+from urllib.parse import urlencode
+
+from asgiref.sync import sync_to_async
+from django.contrib.messages import get_messages
 from django.core.paginator import Paginator
-from django.shortcuts import render, get_object_or_404
-from .models import Product, Category
+from django.db.models import Exists, OuterRef
+from django.http import Http404, JsonResponse
+from django.shortcuts import render
+from django.utils.cache import get_conditional_response
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+from diary.services import aget_progress, request_user
+from diary.suggestions import SHOW as SUGGESTIONS, suggestions_for
+from .autocomplete import suggest
+from .caching import cached, catalog_version
+from .models import NUTRIENTS, Product, Category
+from .pagination import KEY, estimated_count, frozen_page, keyset_page
+from .search import search_products
 import datetime
-from django.db import models
 
-def product_list(request):
+PER_PAGE = 12
+# ключи сортировки; последнее поле уникально — на нём держится курсор
+SORTS = {
+    "": KEY,
+    **{n: (n, "id") for n in NUTRIENTS},
+    **{f"-{n}": (f"-{n}", "-id") for n in NUTRIENTS},
+}
+# параметры, которые задают саму страницу, а не выборку
+PAGE_PARAMS = ("page", "after", "before")
+
+
+def _nutrient_filters(params):
+    """?kcal_min=&kcal_max=&proteins_min=… → {"kcal__gte": Decimal, …}"""
+    filters = {}
+    for n in NUTRIENTS:
+        for bound, lookup in (("min", "gte"), ("max", "lte")):
+            raw = (params.get(f"{n}_{bound}") or "").strip().replace(",", ".")
+            try:
+                value = Decimal(raw)
+            except InvalidOperation:
+                continue
+            if value.is_finite():
+                filters[f"{n}__{lookup}"] = value
+    return filters
+
+
+def _catalog_page(q, cat, filters, sort, page, after, before):
+    """(страница, всего) для списка каталога — то, что кэшируется."""
+    qs = Product.objects.filter(**filters)
+    links = Product.categories.through.objects
+    if cat:
+        # категория вместе с подкатегориями (по материализованному пути);
+        # EXISTS вместо JOIN + DISTINCT
+        path = Category.objects.filter(slug=cat).values_list("path", flat=True).first()
+        # id поддерева списком, а не подзапросом — так связку читают по индексу category_id
+        subtree = list(Category.objects.filter(path__startswith=path).values_list("id", flat=True)) if path else []
+        links = links.filter(category_id__in=subtree)
+        qs = qs.filter(Exists(links.filter(product_id=OuterRef("pk"))))
+
+    if q:
+        # результаты поиска ранжированы и невелики — обычная постраничность
+        # (по релевантности, см. products/search.py, или по выбранному нутриенту)
+        found = search_products(qs, q)
+        if sort:
+            found = found.order_by(*SORTS[sort])
+        page_obj = frozen_page(Paginator(found, PER_PAGE), page)
+        return page_obj, page_obj.paginator.count
+
+    # каталог листаем курсором: цена страницы не зависит от её номера
+    page_obj = keyset_page(qs, PER_PAGE, after=after, before=before, key=SORTS[sort])
+    if filters:
+        # точный COUNT по диапазону дорог на большом каталоге — не показываем
+        total = None
+    elif cat:
+        # число строк связки по индексу category_id
+        total = links.values("product_id").distinct().count()
+    else:
+        total = estimated_count(Product, qs.db)
+    return page_obj, total
+
+
+# --- условные GET ---
+# ETag считается из дешёвых метаданных, без рендера: версия каталога или
+# updated_at продукта плюс то, что на странице зависит от посетителя.
+# При совпадении Django отвечает 304, и view не выполняется вовсе.
+# ETag слабый: маска CSRF-токена меняется при каждом рендере, но страницы
+# с одним ETag равнозначны.
+
+def _etag(*parts):
+    return 'W/"%s"' % hashlib.md5(repr(parts).encode()).hexdigest()
+
+
+def _viewer_state(request):
+    """Всё, что на странице зависит от посетителя, или None — тогда без 304."""
+    # непоказанные сообщения должны дойти до пользователя (len их не помечает прочитанными)
+    if len(get_messages(request)):
+        return None
+    user = request.user
+    if not user.is_authenticated:
+        return ()
+    # роль — для пунктов меню, дата — для форм «Съел(а)», CSRF-секрет — для токена в них
+    is_moderator = user.is_staff or user.groups.filter(name="moderators").exists()
+    return (user.pk, user.is_staff, is_moderator,
+            datetime.date.today().isoformat(), request.META.get("CSRF_COOKIE", ""))
+
+
+def _list_etag(request, viewer, progress):
+    if viewer is None:
+        return None
+    # виджет прогресса есть только в списке
+    return _etag("list", catalog_version(), request.get_full_path(), viewer, progress)
+
+
+def _detail_etag(request, slug):
+    viewer = _viewer_state(request)
+    payload = cached(("product", slug), lambda: _product_payload(slug))
+    if viewer is None or payload is None:
+        return None
+    product, _ = payload
+    suggested = [s.product_id for s in _detail_suggestions(request, product.pk)]
+    # категории продукта называются на странице — их переименование меняет версию каталога
+    return _etag("product", catalog_version(), product.pk, product.updated_at, viewer, suggested)
+
+
+def _detail_last_modified(request, slug):
+    # анониму страница продукта зависит только от продукта: updated_at трогают
+    # и смена категорий, и их переименование (signals.py)
+    if request.user.is_authenticated or _viewer_state(request) is None:
+        return None
+    payload = cached(("product", slug), lambda: _product_payload(slug))
+    return payload[0].updated_at if payload else None
+
+
+# no-cache: браузер хранит страницу, но каждый раз сверяет её условным GET
+@cache_control(private=True, no_cache=True)
+async def product_list(request):
+    """
+    Каталог. Асинхронный: состояние посетителя (для ETag) и прогресс читаются,
+    не блокируя цикл событий (по очереди, в потоке sync_to_async); при совпадении
+    ETag — 304 без данных и рендера. condition() здесь
+    не подходит — он зовёт etag_func синхронно, прямо в цикле событий.
+    """
     q = request.GET.get("q", "").strip()
     cat = request.GET.get("cat", "").strip()
+    page = request.GET.get("page") or ""
+    after = request.GET.get("after") or ""
+    before = request.GET.get("before") or ""
+    filters = _nutrient_filters(request.GET)
+    sort = request.GET.get("sort", "")
+    if sort not in SORTS:
+        sort = ""
+    user = await request_user(request)
 
-    qs = Product.objects.all().select_related()
-    if q:
-        qs = qs.filter(models.Q(name__icontains=q) | models.Q(kind__icontains=q))
-    if cat:
-        qs = qs.filter(categories__slug=cat)
+    viewer, progress = await asyncio.gather(
+        sync_to_async(_viewer_state)(request),
+        aget_progress(user) if user.is_authenticated else _none(),
+    )
+    request.diary_progress = progress
+    etag = _list_etag(request, viewer, progress)
+    response = get_conditional_response(request, etag=etag)
 
-    qs = qs.distinct().order_by("name", "kind")
+    if response is None:
+        # данные страницы не зависят от пользователя — берём из кэша каталога
+        page_obj, total = await sync_to_async(cached)(
+            ("list", q, cat, sorted(filters.items()), sort, page, after, before),
+            lambda: _catalog_page(q, cat, filters, sort, page, after, before),
+        )
+        today = datetime.date.today()
 
-    paginator = Paginator(qs, 12)
-    page = request.GET.get("page")
-    page_obj = paginator.get_page(page)
+        # текущая выборка без параметров страницы — для ссылок пагинации
+        base_qs = urlencode([(k, v) for k, v in request.GET.items() if k not in PAGE_PARAMS and v])
 
-    categories = Category.objects.order_by("name")
-    today = datetime.date.today()
+        ctx = {
+            "page_obj": page_obj,
+            "total": total,
+            "base_qs": base_qs,
+            "sort": sort,
+            "q": q,
+            "current_cat": cat,
+            "today": today,           # ← добавили
+        }
+        response = await sync_to_async(render)(request, "products/list.html", ctx)
+    if etag:
+        response.headers.setdefault("ETag", etag)
+    return response
 
-    ctx = {
-        "page_obj": page_obj,
-        "q": q,
-        "categories": categories,
-        "current_cat": cat,
-        "today": today,           # ← добавили
-    }
-    return render(request, "products/list.html", ctx)
 
+async def _none():
+    return None
 
+
+def _detail_suggestions(request, product_pk):
+    """Подсказки «ещё не пробовали» без текущего продукта; читаются раз на запрос (ETag и view)."""
+    if not hasattr(request, "diary_suggestions"):
+        found = []
+        if request.user.is_authenticated:
+            found = [s for s in suggestions_for(request.user.pk, SUGGESTIONS + 1) if s.product_id != product_pk]
+        request.diary_suggestions = found[:SUGGESTIONS]
+    return request.diary_suggestions
+
+
+def _product_payload(slug):
+    product = Product.objects.filter(slug=slug).first()
+    if product is None:
+        return None
+    return product, list(product.categories.order_by("name"))
+
+
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_detail_etag, last_modified_func=_detail_last_modified)
 def product_detail(request, slug):
-    product = get_object_or_404(Product, slug=slug)
+    payload = cached(("product", slug), lambda: _product_payload(slug))
+    if payload is None:
+        raise Http404("Продукт не найден")
+    product, categories = payload
     today = datetime.date.today()
-    return render(request, "products/detail.html", {"product": product, "today": today})
\ No newline at end of file
+    return render(request, "products/detail.html",
+                  {"product": product, "categories": categories, "today": today,
+                   "suggestions": _detail_suggestions(request, product.pk)})
+
+
+def autocomplete(request):
+    """
+    Подсказки для строки поиска: GET ?q=префикс[&limit=N].
+    Отвечает из индекса в памяти процесса, без запроса к БД.
+    """
+    q = request.GET.get("q", "").strip()
+    try:
+        limit = min(max(int(request.GET.get("limit", 10)), 1), 20)
+    except ValueError:
+        limit = 10
+    return JsonResponse({"results": suggest(q, limit) if q else []})
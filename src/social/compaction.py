@@ -0,0 +1,75 @@
+"""
+Сжатие Event.payload и отчёт об экономии.
+
+Событие хранит только ключи (hydration.py). Старые строки могли сохранить
+копии полей продукта (LEGACY_KEYS) — их убирает миграция 0004, а
+manage.py compact_event_payloads дочищает то, что осталось, и показывает
+размер payload и таблицы до и после. Копии остаются только у событий, где
+упомянут удалённый продукт: подставить его при показе уже не из чего.
+"""
+import json
+
+from django.db import connections
+
+from products.models import Product
+from .models import Event
+
+LEGACY_KEYS = ("product_slug", "product_name", "kind")
+BATCH = 2000
+
+
+def payload_size(payload):
+    """Размер payload в байтах — как его хранит JSON-колонка."""
+    return len(json.dumps(payload, ensure_ascii=False).encode())
+
+
+def table_size(model, using="default"):
+    """
+    Сколько байт на диске занимает таблица модели с индексами (PostgreSQL —
+    pg_total_relation_size, SQLite — dbstat) или None, если база не умеет сказать.
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute("SELECT pg_total_relation_size(%s)", [table])
+        elif connection.vendor == "sqlite":
+            try:
+                cursor.execute("SELECT SUM(pgsize) FROM dbstat WHERE name IN "
+                               "(SELECT name FROM sqlite_master WHERE tbl_name = %s)", [table])
+            except Exception:
+                return None  # SQLite собран без dbstat
+        else:
+            return None
+        return cursor.fetchone()[0]
+
+
+def compact_payloads(write=True):
+    """
+    Убрать копии полей продукта из событий, все продукты которых на месте.
+    Вернёт {"events", "changed", "before", "after"} — число событий, сколько
+    из них сжато (или было бы сжато при write=False) и байты payload до и после.
+    """
+    stats = {"events": 0, "changed": 0, "before": 0, "after": 0}
+    last = 0
+    while True:
+        events = list(Event.objects.filter(pk__gt=last).order_by("pk").only("id", "payload")[:BATCH])
+        if not events:
+            break
+        last = events[-1].pk
+        legacy = [e for e in events if any(k in e.payload for k in LEGACY_KEYS)]
+        legacy_ids = {e.pk for e in legacy}
+        existing = set(Product.objects.filter(
+            pk__in={pk for e in legacy for pk in e.payload.get("product_ids") or ()}).values_list("pk", flat=True))
+        dirty = []
+        for e in events:
+            stats["before"] += payload_size(e.payload)
+            if e.pk in legacy_ids and set(e.payload.get("product_ids") or ()) <= existing:
+                e.payload = {k: v for k, v in e.payload.items() if k not in LEGACY_KEYS}
+                dirty.append(e)
+            stats["after"] += payload_size(e.payload)
+        if write:
+            Event.objects.bulk_update(dirty, ["payload"])
+        stats["events"] += len(events)
+        stats["changed"] += len(dirty)
+    return stats
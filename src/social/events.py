@@ -0,0 +1,113 @@
+"""
+События ленты «добавил записи в дневник» с укрупнением.
+
+Раньше каждая запись давала отдельный Event, и пакетная загрузка (импорт,
+офлайн-синхронизация, обед из пяти продуктов) превращалась в пачку
+одинаковых строк — в ленте и в FeedItem у каждого подписчика. Теперь записи
+пользователя на одну дату дневника, сделанные в пределах окна
+FEED_COALESCE_MINUTES от первой, собираются в одно событие:
+
+    payload = {"product_ids": [...], "date": "YYYY-MM-DD"}
+
+Новое событие раскладывается по лентам как обычно (inbox.py). Следующие
+записи только дописывают product_ids в уже существующую строку: UPDATE
+одной строки, FeedItem не трогаются — продукты подставляются при показе
+(hydration.py). Место в ленте остаётся по времени первой записи. Событие
+закрывается по окну или по MAX_PRODUCTS, дальше начинается новое.
+
+Удалённая запись вычёркивается из событий своей даты; опустевшее событие
+удаляется вместе со строками лент (CASCADE).
+
+Всё вызывается под lock_diary(user): блокировка дневника сериализует записи
+пользователя, поэтому двух открытых событий на одну дату не бывает.
+"""
+import datetime
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import live
+from .inbox import events_created
+from .models import Event
+
+ENTRY_CREATED = "entry_created"
+MAX_PRODUCTS = 50
+
+
+def _open_events(user_id):
+    """{дата: событие} — последние события пользователя, ещё открытые для дописывания."""
+    since = timezone.now() - datetime.timedelta(minutes=settings.FEED_COALESCE_MINUTES)
+    events = (Event.objects.filter(user_id=user_id, type=ENTRY_CREATED, created_at__gte=since)
+              .order_by("created_at", "id"))
+    # по индексу (user, created_at): в окне единицы строк; более позднее перекрывает
+    return {e.payload.get("date"): e for e in events if len(e.payload.get("product_ids") or ()) < MAX_PRODUCTS}
+
+
+def record_entries(user_id, entries):
+    """
+    Отразить новые записи пользователя в ленте: дописать в открытые события
+    или создать новые (разошлются после коммита). Вернёт созданные события.
+    """
+    by_date = defaultdict(list)
+    for e in entries:
+        # из формы product_id приходит строкой — в payload храним числа
+        by_date[e.date.isoformat()].append(int(e.product_id))
+    if not by_date:
+        return []
+
+    opened = _open_events(user_id)
+    merged, new = [], []
+    for day, product_ids in by_date.items():
+        event = opened.get(day)
+        if event is not None:
+            current = event.payload.get("product_ids") or []
+            fresh = [pk for pk in dict.fromkeys(product_ids) if pk not in current]
+            room = MAX_PRODUCTS - len(current)
+            if fresh[:room]:
+                event.payload = dict(event.payload, product_ids=current + fresh[:room])
+                merged.append(event)
+            product_ids = fresh[room:]
+        product_ids = list(dict.fromkeys(product_ids))
+        for start in range(0, len(product_ids), MAX_PRODUCTS):
+            new.append(Event(
+                user_id=user_id,
+                type=ENTRY_CREATED,
+                # только ключи: названия и слаги подставляются при показе (hydration.py)
+                payload={"product_ids": product_ids[start:start + MAX_PRODUCTS], "date": day},
+            ))
+
+    Event.objects.bulk_update(merged, ["payload"])
+    if merged:
+        # дописанные события живая лента заменит на месте
+        updated = [(user_id, e.pk) for e in merged]
+        transaction.on_commit(lambda: live.publish(updated))
+    new = Event.objects.bulk_create(new)
+    events_created(new)
+    return new
+
+
+def forget_entries(entries):
+    """Вычеркнуть удалённые записи из их событий; пустые события удалить."""
+    removed = defaultdict(set)  # (пользователь, дата) → продукты
+    for e in entries:
+        removed[(e.user_id, e.date.isoformat())].add(int(e.product_id))
+
+    for (user_id, day), product_ids in removed.items():
+        events = (Event.objects.filter(user_id=user_id, type=ENTRY_CREATED, payload__date=day)
+                  .only("id", "payload"))
+        dirty, empty = [], []
+        for event in events:
+            current = event.payload.get("product_ids") or []
+            left = [pk for pk in current if pk not in product_ids]
+            if len(left) == len(current):
+                continue
+            if left:
+                event.payload = dict(event.payload, product_ids=left)
+                dirty.append(event)
+            else:
+                empty.append(event.pk)
+        Event.objects.bulk_update(dirty, ["payload"])
+        if empty:
+            Event.objects.filter(pk__in=empty).delete()
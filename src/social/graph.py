@@ -0,0 +1,52 @@
+"""
+Граф подписок из кэша.
+
+Кого читает пользователь и кто читает его — нужно на многих страницах
+(кнопки «Подписаться/Отписаться», рейтинг среди подписок, подсказки людей).
+Списки смежности кэшируются на пользователя под ключом с его «версией
+графа»; подписка и отписка (signals.py) сдвигают версию обоих участников
+после коммита. Как и у кэша каталога, версия берётся до чтения из БД,
+поэтому подписка во время чтения не оставит устаревшего списка под новой
+версией.
+"""
+from django.core.cache import cache
+
+from products.caching import bump_version, get_version
+
+from .models import Follow
+
+TIMEOUT = 60 * 60
+
+
+def _version_key(user_id):
+    return f"follow:version:{user_id}"
+
+
+def graph_version(user_id):
+    return get_version(_version_key(user_id))
+
+
+def bump_graph_version(*user_ids):
+    """Сбросить кэш подписок пользователей после коммита текущей транзакции."""
+    bump_version(*map(_version_key, user_ids))
+
+
+def _cached(user_id, kind, compute):
+    key = f"follow:{kind}:{user_id}:{graph_version(user_id)}"
+    value = cache.get(key)
+    if value is None:
+        value = frozenset(compute())
+        cache.set(key, value, TIMEOUT)
+    return value
+
+
+def following_ids(user_id):
+    """frozenset id тех, на кого подписан пользователь."""
+    return _cached(user_id, "following", lambda: Follow.objects.filter(follower_id=user_id)
+                   .values_list("followee_id", flat=True))
+
+
+def follower_ids(user_id):
+    """frozenset id подписчиков пользователя."""
+    return _cached(user_id, "followers", lambda: Follow.objects.filter(followee_id=user_id)
+                   .values_list("follower_id", flat=True))
@@ -0,0 +1,25 @@
+"""
+Подстановка объектов в события ленты.
+
+Event.payload хранит только ключи: {"product_ids": […], "date": …}. Перед
+рендером страница событий «гидратируется»: ключи собираются со всей страницы
+и по каждому типу объекта делается один пакетный запрос (для продуктов —
+через кэш воркера, products/refs.py). Поэтому в ленте всегда актуальные
+названия, а строки Event не хранят копий.
+"""
+from products.refs import product_refs
+
+# (ключ списка id в payload, атрибут события, загрузчик {id: объект})
+SUBJECTS = [
+    ("product_ids", "products", product_refs),
+]
+
+
+def hydrate(events):
+    """Проставить событиям списки объектов из SUBJECTS (удалённые пропускаются)."""
+    for key, attr, load in SUBJECTS:
+        ids = {pk for e in events for pk in e.payload.get(key) or ()}
+        found = load(ids) if ids else {}
+        for e in events:
+            setattr(e, attr, [found[pk] for pk in e.payload.get(key) or () if pk in found])
+    return events
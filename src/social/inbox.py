@@ -0,0 +1,120 @@
+"""
+Ленты подписчиков, заполняемые при записи (fan-out on write).
+
+Событие Event сразу раскладывается в FeedItem каждому подписчику автора и
+самому автору. Чтение ленты — один проход по индексу (owner, created_at),
+сколько бы подписок ни было.
+
+У автора с небольшим числом подписчиков (до FEED_FANOUT_INLINE) рассылка идёт
+прямо после коммита, в том же запросе. Крупные рассылки уходят фоновому потоку
+процесса. Пока рассылки нет, у события fanned_out=False, поэтому упавший
+процесс ничего не теряет: manage.py rebuild_feeds --pending дорассылает хвост.
+Разосланные события сразу уходят открытым живым лентам (live.py).
+
+Подписка подтягивает в ленту последние BACKFILL событий автора, отписка
+удаляет его строки (signals.py). Повторная раскладка безопасна: пара
+(owner, event) уникальна, конфликты игнорируются.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from . import live
+from .graph import following_ids
+from .models import Event, FeedItem, Follow
+
+logger = logging.getLogger(__name__)
+
+BACKFILL = 200
+BATCH = 5000
+
+_pool = None
+
+
+def _items(owner_ids, events):
+    return [
+        FeedItem(owner_id=owner, event_id=e.pk, author_id=e.user_id, created_at=e.created_at)
+        for e in events
+        for owner in owner_ids
+    ]
+
+
+def fan_out(event_ids):
+    """Разложить события по лентам подписчиков и отметить разосланными."""
+    events = list(Event.objects.filter(pk__in=event_ids, fanned_out=False)
+                  .only("id", "user_id", "created_at"))
+    by_author = {}
+    for e in events:
+        by_author.setdefault(e.user_id, []).append(e)
+    for author_id, author_events in by_author.items():
+        followers = Follow.objects.filter(followee_id=author_id).values_list("follower_id", flat=True)
+        owners = [author_id]
+        for follower_id in followers.iterator(chunk_size=BATCH):
+            owners.append(follower_id)
+            if len(owners) >= BATCH:
+                FeedItem.objects.bulk_create(_items(owners, author_events), ignore_conflicts=True)
+                owners = []
+        FeedItem.objects.bulk_create(_items(owners, author_events), ignore_conflicts=True)
+    Event.objects.filter(pk__in=[e.pk for e in events]).update(fanned_out=True)
+    live.publish([(e.user_id, e.pk) for e in events])
+
+
+def _fan_out_in_background(event_ids):
+    # поток пула — своё соединение с БД закрываем сами
+    try:
+        fan_out(event_ids)
+    except Exception:
+        logger.exception("Не удалось разослать события %s", event_ids)
+    finally:
+        connection.close()
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        # один поток: крупные рассылки идут по очереди и не забирают все соединения
+        _pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="feed-fanout")
+    return _pool
+
+
+def events_created(events):
+    """Разослать новые события автора после коммита (мелкие — сразу, крупные — в фоне)."""
+    if not events:
+        return
+    author_id = events[0].user_id
+    event_ids = [e.pk for e in events]
+
+    def _dispatch():
+        followers = Follow.objects.filter(followee_id=author_id)
+        if not followers[settings.FEED_FANOUT_INLINE:settings.FEED_FANOUT_INLINE + 1].exists():
+            fan_out(event_ids)
+        else:
+            _get_pool().submit(_fan_out_in_background, event_ids)
+
+    transaction.on_commit(_dispatch)
+
+
+def backfill(owner_id, author_id, limit=BACKFILL):
+    """Последние события автора — в ленту нового подписчика."""
+    events = Event.objects.filter(user_id=author_id).only("id", "user_id", "created_at")[:limit]
+    FeedItem.objects.bulk_create(_items([owner_id], events), ignore_conflicts=True)
+
+
+def prune(owner_id, author_id):
+    """Убрать из ленты события автора после отписки."""
+    FeedItem.objects.filter(owner_id=owner_id, author_id=author_id).delete()
+
+
+def rebuild(owner_id, limit=BACKFILL):
+    """Собрать ленту заново: свои события и последние limit от каждой подписки."""
+    with transaction.atomic():
+        FeedItem.objects.filter(owner_id=owner_id).delete()
+        backfill(owner_id, owner_id, limit)
+        for author_id in following_ids(owner_id):
+            backfill(owner_id, author_id, limit)
+
+
+def pending_event_ids():
+    return list(Event.objects.filter(fanned_out=False).order_by("id").values_list("id", flat=True))
@@ -0,0 +1,223 @@
+"""
+Живая лента: новые события подписок по Server-Sent Events.
+
+Открытая лента держит GET /social/feed/live/ (только под ASGI, config/asgi.py).
+Соединение — одна корутина и очередь на QUEUE_SIZE сообщений: ни потока,
+ни соединения с БД оно не занимает, поэтому тысячи простаивающих вкладок
+обходятся дёшево. Больше FEED_LIVE_MAX соединений на процесс не принимается
+(503, клиент переподключится позже).
+
+Источник — inbox.fan_out: когда событие разложено по лентам, publish()
+сообщает о нём (автор, id события). Дальше работает хаб процесса:
+- FEED_LIVE_BACKEND=local (по умолчанию): publish из любого потока передаёт
+  уведомление в цикл событий процесса (call_soon_threadsafe);
+- FEED_LIVE_BACKEND=postgres, для нескольких воркеров: publish делает
+  NOTIFY, а каждый ASGI-воркер держит одно соединение с LISTEN и раздаёт
+  уведомления своим подписчикам. Пока LISTEN переподключается, уведомления
+  теряются — обычная перезагрузка ленты их покажет.
+Фрагмент события рендерится один раз на процесс и только если в процессе
+есть подписчики автора; во все их очереди кладётся одна и та же строка.
+
+Медленный клиент не тормозит остальных: если его очередь полна,
+накопленное выбрасывается и ему уходит event: reset — страница предложит
+обновиться. Раз в HEARTBEAT секунд уходит комментарий-пинг: держит прокси
+и замечает закрытые вкладки. Список авторов соединения читается из кэша
+графа (graph.py) при подключении и после подписки/отписки — об этом хабу
+сообщает follows_changed тем же путём, что и о событиях; периодически его
+не перечитываем, чтобы тысячи соединений не занимали поток sync_to_async.
+"""
+import asyncio
+import contextvars
+import json
+import logging
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.template.loader import render_to_string
+
+from .graph import following_ids
+from .hydration import hydrate
+from .models import Event
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "feed_live"
+QUEUE_SIZE = 32
+HEARTBEAT = 20
+RETRY_MS = 5000
+
+_loop = None
+_subscribers = defaultdict(set)  # автор → подписчики
+_by_user = defaultdict(set)  # зритель → его соединения
+_tasks = set()
+_count = 0
+_listener = None
+
+
+class Subscriber:
+    """Одно открытое соединение: чьи события ждёт и очередь готовых сообщений."""
+
+    def __init__(self, user_id, own):
+        self.user_id = user_id
+        self.own = own
+        self.authors = frozenset()
+        self.queue = asyncio.Queue(QUEUE_SIZE)
+        self.lagged = False
+
+
+def _follow(sub, authors):
+    for author_id in sub.authors - authors:
+        subs = _subscribers[author_id]
+        subs.discard(sub)
+        if not subs:
+            del _subscribers[author_id]
+    for author_id in authors - sub.authors:
+        _subscribers[author_id].add(sub)
+    sub.authors = authors
+
+
+async def _authors(sub):
+    ids = await sync_to_async(following_ids)(sub.user_id)
+    return ids | {sub.user_id} if sub.own else ids
+
+
+def is_full():
+    return _count >= settings.FEED_LIVE_MAX
+
+
+def _send(messages):
+    # сообщения хабу: ("e", автор, событие) — новое событие, ("f", зритель) — сменились подписки
+    if settings.FEED_LIVE_BACKEND == "postgres":
+        # вне транзакции NOTIFY уходит сразу, иначе — при коммите
+        with connection.cursor() as cursor:
+            for message in messages:
+                cursor.execute("SELECT pg_notify(%s, %s)", [CHANNEL, ":".join(map(str, message))])
+        return
+    loop = _loop
+    if loop is None or loop.is_closed():
+        return  # в процессе нет ни одной живой ленты (например, WSGI)
+    for message in messages:
+        # чистый контекст: задачи хаба не должны наследовать контекст запроса-публикатора
+        loop.call_soon_threadsafe(_dispatch, *message, context=contextvars.Context())
+
+
+def publish(events):
+    """Сообщить живым лентам о разосланных событиях [(автор, id)]; из любого потока."""
+    if events:
+        _send([("e", author_id, event_id) for author_id, event_id in events])
+
+
+def follows_changed(user_id):
+    """Сообщить живым лентам user_id, что его подписки изменились."""
+    _send([("f", user_id)])
+
+
+def _spawn(coro):
+    task = asyncio.ensure_future(coro)
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+
+
+def _dispatch(kind, *ids):
+    # в цикле событий; если в процессе некому показывать — ничего не делаем
+    if kind == "e" and _subscribers.get(ids[0]):
+        _spawn(_deliver(*ids))
+    elif kind == "f" and _by_user.get(ids[0]):
+        _spawn(_refresh(ids[0]))
+
+
+async def _refresh(user_id):
+    subs = list(_by_user.get(user_id, ()))
+    if subs:
+        ids = await sync_to_async(following_ids)(user_id)
+        for sub in subs:
+            _follow(sub, ids | {user_id} if sub.own else ids)
+
+
+def _render(event_id):
+    # поток хаба живёт дольше запросов — сами следим за соединением с БД
+    close_old_connections()
+    event = Event.objects.select_related("user").filter(pk=event_id).first()
+    if event is None:
+        return None
+    hydrate([event])
+    return render_to_string("social/feed_items.html", {"events": [event]})
+
+
+async def _deliver(author_id, event_id):
+    try:
+        html = await sync_to_async(_render)(event_id)
+    except Exception:
+        logger.exception("Не удалось подготовить событие %s для живой ленты", event_id)
+        return
+    if html is None:
+        return
+    message = f"data: {json.dumps({'id': event_id, 'html': html}, ensure_ascii=False)}\n\n"
+    for sub in list(_subscribers.get(author_id, ())):
+        try:
+            sub.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            sub.lagged = True
+
+
+async def _listen():
+    import psycopg
+
+    db = settings.DATABASES["default"]
+    delay = 1
+    while True:
+        try:
+            aconn = await psycopg.AsyncConnection.connect(
+                dbname=db["NAME"], user=db["USER"], password=db["PASSWORD"],
+                host=db["HOST"], port=db["PORT"], autocommit=True,
+            )
+            async with aconn:
+                await aconn.execute(f"LISTEN {CHANNEL}")
+                delay = 1
+                async for notify in aconn.notifies():
+                    kind, *ids = notify.payload.split(":")
+                    _dispatch(kind, *map(int, ids))
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("LISTEN %s: соединение потеряно, повтор через %s с", CHANNEL, delay)
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, 60)
+
+
+async def stream(user_id, own=True):
+    """
+    Асинхронный генератор SSE для StreamingHttpResponse: события авторов,
+    которых читает user_id (и его собственные, если own).
+    """
+    global _loop, _count, _listener
+    _loop = asyncio.get_running_loop()
+    if settings.FEED_LIVE_BACKEND == "postgres" and (_listener is None or _listener.done()):
+        _listener = contextvars.Context().run(asyncio.ensure_future, _listen())
+
+    sub = Subscriber(user_id, own)
+    _count += 1
+    _by_user[user_id].add(sub)
+    try:
+        _follow(sub, await _authors(sub))
+        yield f"retry: {RETRY_MS}\n\n"
+        while True:
+            try:
+                message = await asyncio.wait_for(sub.queue.get(), HEARTBEAT)
+            except asyncio.TimeoutError:
+                message = ": ping\n\n"
+            if sub.lagged:
+                # клиент не успевает читать: пропущенное не догоняем, просим обновить
+                while not sub.queue.empty():
+                    sub.queue.get_nowait()
+                sub.lagged = False
+                message = "event: reset\ndata: {}\n\n"
+            yield message
+    finally:
+        _follow(sub, frozenset())
+        _by_user[user_id].discard(sub)
+        if not _by_user[user_id]:
+            del _by_user[user_id]
+        _count -= 1
@@ -0,0 +1,95 @@
+import datetime
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+
+from products.bench import BenchCommand
+from products.pagination import decode_cursor, encode_cursor, keyset_page
+from social.models import Event, FeedItem, Follow
+from social.views import FEED_KEY, FEED_PER_PAGE
+
+User = get_user_model()
+BATCH = 10_000
+
+
+class Command(BenchCommand):
+    help = (
+        "Замеры ленты на сгенерированных событиях: прежний запрос по Event "
+        "(user_id IN подписки, сортировка) против ленты FeedItem с курсором, плюс планы. "
+        "Всё выполняется в транзакции, которая в конце откатывается."
+    )
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument("--events", type=int, default=2_000_000)
+        parser.add_argument("--authors", type=int, default=2000)
+        parser.add_argument("--following", type=int, default=500)
+
+    def _seed(self, **options):
+        n, authors, following = options["events"], options["authors"], options["following"]
+        started = time.monotonic()
+        users = User.objects.bulk_create(
+            [User(email=f"bench-feed-{i}@example.com") for i in range(authors + 1)])
+        if users[0].pk is None:
+            users = list(User.objects.filter(email__startswith="bench-feed-").order_by("pk"))
+        self.viewer, authors = users[0], [u.pk for u in users[1:]]
+        followees = set(random.sample(authors, min(following, len(authors))))
+        Follow.objects.bulk_create([Follow(follower=self.viewer, followee_id=a) for a in followees])
+        self.followees = list(followees)
+
+        now = timezone.now()
+        for start in range(0, n, BATCH):
+            stop = min(start + BATCH, n)
+            events = Event.objects.bulk_create([
+                Event(user_id=random.choice(authors), type="entry_created",
+                      payload={"product_ids": [], "date": now.date().isoformat()}, fanned_out=True)
+                for _ in range(start, stop)
+            ])
+            if events[0].pk is None:
+                events = list(Event.objects.order_by("-id")[:len(events)])[::-1]
+            # auto_now_add поставил всем «сейчас» — разносим события по времени вторым запросом
+            for i, e in zip(range(start, stop), events):
+                e.created_at = now - datetime.timedelta(seconds=(n - i) * 30)
+            Event.objects.bulk_update(events, ["created_at"], batch_size=1000)
+            # лента зрителя и лента одного случайного подписчика на каждое событие
+            FeedItem.objects.bulk_create([
+                FeedItem(owner_id=owner, event_id=e.pk, author_id=e.user_id, created_at=e.created_at)
+                for e in events
+                for owner in {random.choice(authors), self.viewer.pk if e.user_id in followees else None}
+                if owner is not None
+            ], ignore_conflicts=True)
+        self._analyze()
+        self.stdout.write(
+            f"Сгенерировано {n} событий, {FeedItem.objects.count()} строк лент "
+            f"за {time.monotonic() - started:.1f} с ({connection.vendor})."
+        )
+
+    def _run(self):
+        viewer = self.viewer
+        old = (Event.objects.filter(Q(user_id__in=self.followees) | Q(user=viewer))
+               .select_related("user").order_by("-created_at"))
+        inbox = FeedItem.objects.filter(owner=viewer).select_related("event__user")
+        depth = inbox.count() * 9 // 10
+        deep = encode_cursor(inbox.order_by(*FEED_KEY)[depth], FEED_KEY)
+
+        scenarios = [
+            ("Event, IN подписки (как было), стр. 1", lambda: list(old[:FEED_PER_PAGE])),
+            ("Event, IN подписки, OFFSET на 90%", lambda: list(old[depth:depth + FEED_PER_PAGE])),
+            ("FeedItem, стр. 1", lambda: list(keyset_page(inbox, FEED_PER_PAGE, key=FEED_KEY))),
+            ("FeedItem, курсор на 90%",
+             lambda: list(keyset_page(inbox, FEED_PER_PAGE, after=deep, key=FEED_KEY))),
+        ]
+        self._scenarios(scenarios)
+
+        # то же условие, что строит keyset_page для курсора
+        created, event_id = decode_cursor(deep, FEED_KEY)
+        seek = inbox.filter(Q(created_at__lte=created) & (
+            Q(created_at__lt=created) | Q(created_at=created, event_id__lt=event_id)))
+        self._plans([
+            ("Event, IN подписки", old[:FEED_PER_PAGE]),
+            ("FeedItem, курсор", seek.order_by(*FEED_KEY)[:FEED_PER_PAGE + 1]),
+        ])
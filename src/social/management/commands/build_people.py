@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from social.people import CHUNK, K, build_people
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересчитывает подсказки «возможно, вы знакомы» (PersonSuggestion): друзья друзей "
+        "и авторы похожих дневников. Запускать по расписанию, например раз в сутки."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--k", type=int, default=K, help="Подсказок на пользователя")
+        parser.add_argument("--chunk", type=int, default=CHUNK, help="Пользователей в пачке")
+
+    def handle(self, *args, **options):
+        stats = build_people(
+            k=max(1, options["k"]),
+            chunk=max(1, options["chunk"]),
+            log=lambda msg: self.stderr.write(msg),
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Готово за {stats['seconds']:.1f} с: пользователей {stats['users']}, "
+            f"подсказок {stats['suggestions']}."
+        ))
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from social.compaction import compact_payloads, table_size
+from social.models import Event
+
+
+def _fmt(size):
+    return "н/д" if size is None else f"{size / 1024:.1f} КБ"
+
+
+class Command(BaseCommand):
+    help = (
+        "Убирает из Event.payload копии полей продуктов (остаются только id) и печатает "
+        "размер payload и таблицы событий до и после. С --report только считает."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--report", action="store_true", help="Ничего не менять, только отчёт")
+
+    def handle(self, *args, **options):
+        write = not options["report"]
+        table_before = table_size(Event)
+        with transaction.atomic():
+            stats = compact_payloads(write=write)
+        table_after = table_size(Event) if write else None
+
+        before, after = stats["before"], stats["after"]
+        saved = 100 * (before - after) / before if before else 0
+        verb = "сжато" if write else "можно сжать"
+        self.stdout.write(
+            f"Событий {stats['events']}, {verb} {stats['changed']}: "
+            f"payload {before} → {after} байт (−{saved:.0f}%)."
+        )
+        if write:
+            # освобождённые страницы таблица отдаёт не сразу — см. VACUUM
+            self.stdout.write(f"Таблица событий с индексами: {_fmt(table_before)} → {_fmt(table_after)}.")
+        else:
+            self.stdout.write(f"Таблица событий с индексами: {_fmt(table_before)}.")
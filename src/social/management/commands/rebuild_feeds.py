@@ -0,0 +1,39 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from social import inbox
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересобирает ленты (FeedItem): свои события и последние --backfill событий "
+        "каждой подписки. С --pending только дорассылает события, которые не успел "
+        "разослать фоновый поток (например, после перезапуска процесса)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", type=int, help="id пользователя")
+        parser.add_argument("--pending", action="store_true", help="Только неразосланные события")
+        parser.add_argument("--backfill", type=int, default=inbox.BACKFILL)
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        pending = inbox.pending_event_ids()
+        for start in range(0, len(pending), 1000):
+            inbox.fan_out(pending[start:start + 1000])
+        self.stdout.write(f"Дорассылано событий: {len(pending)}.")
+        if options["pending"]:
+            return
+
+        users = get_user_model().objects.order_by("pk")
+        if options["user"] is not None:
+            users = users.filter(pk=options["user"])
+        rebuilt = 0
+        for pk in users.values_list("pk", flat=True).iterator(chunk_size=1000):
+            inbox.rebuild(pk, limit=max(0, options["backfill"]))
+            rebuilt += 1
+        self.stdout.write(self.style.SUCCESS(
+            f"Пересобрано лент: {rebuilt} за {time.monotonic() - started:.1f} с."
+        ))
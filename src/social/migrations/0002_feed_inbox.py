@@ -0,0 +1,92 @@
+# Generated by Django 5.2.6 on 2026-10-18 12:25
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+BACKFILL = 200
+
+
+def fill_inboxes(apps, schema_editor):
+    # как inbox.rebuild: свои события и последние BACKFILL от каждой подписки
+    Event = apps.get_model("social", "Event")
+    FeedItem = apps.get_model("social", "FeedItem")
+    Follow = apps.get_model("social", "Follow")
+    authors = {}
+
+    def recent(author_id):
+        if author_id not in authors:
+            authors[author_id] = list(Event.objects.filter(user_id=author_id)
+                                      .order_by("-created_at").values_list("id", "created_at")[:BACKFILL])
+        return authors[author_id]
+
+    def fill(owner_id, author_id):
+        FeedItem.objects.bulk_create(
+            [FeedItem(owner_id=owner_id, event_id=pk, author_id=author_id, created_at=created)
+             for pk, created in recent(author_id)],
+            ignore_conflicts=True,
+        )
+
+    for author_id in Event.objects.values_list("user_id", flat=True).distinct().iterator():
+        fill(author_id, author_id)
+        authors.clear()
+    for follower_id, followee_id in Follow.objects.order_by("followee_id").values_list("follower_id", "followee_id").iterator():
+        if followee_id not in authors:
+            authors.clear()
+        fill(follower_id, followee_id)
+    Event.objects.update(fanned_out=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('social', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='fanned_out',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(condition=models.Q(('fanned_out', False)), fields=['id'], name='event_fanout_pending_idx'),
+        ),
+        migrations.AddField(
+            model_name='feeditem',
+            name='author',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='feeditem',
+            name='event',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='social.event'),
+        ),
+        migrations.AddField(
+            model_name='feeditem',
+            name='owner',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='feeditem',
+            index=models.Index(fields=['owner', '-created_at'], name='feed_item_owner_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='feeditem',
+            index=models.Index(fields=['owner', 'author'], name='feed_item_owner_author_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='feeditem',
+            constraint=models.UniqueConstraint(fields=('owner', 'event'), name='uniq_feed_item_owner_event'),
+        ),
+        migrations.RunPython(fill_inboxes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,57 @@
+from django.db import migrations
+
+LEGACY_KEYS = ("product_slug", "product_name", "kind")
+BATCH = 2000
+
+
+def compact_payloads(apps, schema_editor):
+    # названия продуктов теперь подставляются при показе (social/hydration.py);
+    # копии оставляем только у событий об удалённых продуктах;
+    # отчёт об экономии — manage.py compact_event_payloads --report
+    Event = apps.get_model("social", "Event")
+    Product = apps.get_model("products", "Product")
+    last = 0
+    while True:
+        events = list(Event.objects.filter(pk__gt=last).order_by("pk").only("id", "payload")[:BATCH])
+        if not events:
+            break
+        last = events[-1].pk
+        existing = set(Product.objects.filter(
+            pk__in={e.payload.get("product_id") for e in events} - {None}).values_list("pk", flat=True))
+        dirty = []
+        for e in events:
+            if e.payload.get("product_id") in existing and any(k in e.payload for k in LEGACY_KEYS):
+                e.payload = {k: v for k, v in e.payload.items() if k not in LEGACY_KEYS}
+                dirty.append(e)
+        Event.objects.bulk_update(dirty, ["payload"])
+
+
+def expand_payloads(apps, schema_editor):
+    Event = apps.get_model("social", "Event")
+    Product = apps.get_model("products", "Product")
+    last = 0
+    while True:
+        events = list(Event.objects.filter(pk__gt=last).order_by("pk").only("id", "payload")[:BATCH])
+        if not events:
+            break
+        last = events[-1].pk
+        products = Product.objects.in_bulk({e.payload.get("product_id") for e in events} - {None})
+        dirty = []
+        for e in events:
+            p = products.get(e.payload.get("product_id"))
+            if p is not None:
+                e.payload = dict(e.payload, product_slug=p.slug, product_name=p.name, kind=p.kind)
+                dirty.append(e)
+        Event.objects.bulk_update(dirty, ["payload"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('social', '0003_feed_cursor_indexes'),
+        ('products', '0007_product_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(compact_payloads, expand_payloads),
+    ]
@@ -0,0 +1,57 @@
+from django.db import migrations
+
+BATCH = 2000
+
+
+def _rewrite(apps, convert):
+    Event = apps.get_model("social", "Event")
+    last = 0
+    while True:
+        events = list(Event.objects.filter(pk__gt=last).order_by("pk").only("id", "payload")[:BATCH])
+        if not events:
+            break
+        last = events[-1].pk
+        dirty = []
+        for e in events:
+            payload = convert(e.payload)
+            if payload is not None:
+                e.payload = payload
+                dirty.append(e)
+        Event.objects.bulk_update(dirty, ["payload"])
+
+
+def to_product_ids(apps, schema_editor):
+    # события укрупняются (social/events.py): один продукт — список из одного
+    def convert(payload):
+        if "product_id" not in payload:
+            return None
+        payload = dict(payload)
+        pk = payload.pop("product_id")
+        payload["product_ids"] = [pk] if pk is not None else []
+        return payload
+
+    _rewrite(apps, convert)
+
+
+def to_product_id(apps, schema_editor):
+    # у укрупнённых событий прежняя схема сохранит только первый продукт
+    def convert(payload):
+        if "product_ids" not in payload:
+            return None
+        payload = dict(payload)
+        ids = payload.pop("product_ids")
+        payload["product_id"] = ids[0] if ids else None
+        return payload
+
+    _rewrite(apps, convert)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('social', '0004_compact_event_payloads'),
+    ]
+
+    operations = [
+        migrations.RunPython(to_product_ids, to_product_id),
+    ]
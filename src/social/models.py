@@ -28,11 +28,70 @@ class Event(models.Model):
     ]
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="events")
     type = models.CharField(max_length=32, choices=TYPE_CHOICES)
-    payload = models.JSONField(default=dict, blank=True)  # {product_id, product_name, kind, date}
+    # только ключи: {product_ids, date}; объекты подставляет hydration.hydrate,
+    # записи одной даты укрупняются в одно событие (events.py)
+    payload = models.JSONField(default=dict, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # разослано ли по лентам подписчиков (inbox.py); False — ждёт фонового воркера
+    fanned_out = models.BooleanField(default=False, editable=False)
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            # очередь неразосланных — маленький частичный индекс
+            models.Index(fields=["id"], condition=models.Q(fanned_out=False), name="event_fanout_pending_idx"),
+            # события автора от новых к старым: добор в ленту при подписке, выборка по автору
+            models.Index(fields=["user", "-created_at", "-id"], name="event_user_created_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.user} {self.type} {self.created_at:%Y-%m-%d %H:%M}"
+
+
+class FeedItem(models.Model):
+    """
+    Строка ленты: событие event в ленте owner. Заполняется при создании события
+    (fan-out on write, см. inbox.py), поэтому лента читается одним проходом
+    по индексу (owner, created_at). author и created_at скопированы из события —
+    для отписки и сортировки без JOIN.
+    """
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="+")
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name="+")
+    author = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="+")
+    created_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["owner", "event"], name="uniq_feed_item_owner_event")
+        ]
+        indexes = [
+            # курсор ленты (created_at, event) — диапазон по этому индексу, без сортировки
+            models.Index(fields=["owner", "-created_at", "-event"], name="feed_item_owner_cursor_idx"),
+            models.Index(fields=["owner", "author"], name="feed_item_owner_author_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.owner_id} ← {self.event_id}"
+
+
+class PersonSuggestion(models.Model):
+    """
+    «Возможно, вы знакомы»: top-K людей для подписки — друзья друзей и авторы
+    похожих дневников. Таблицу целиком пересобирает manage.py build_people
+    (см. people.py); тех, на кого уже подписались, отсекает чтение.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="+")
+    suggested = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="+")
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+    # общих подписок и сходство дневников (Жаккар по продуктам) — для подписи в виджете
+    mutual = models.PositiveIntegerField(default=0)
+    similarity = models.FloatField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "rank"], name="uniq_person_suggestion_user_rank")
+        ]
 
     def __str__(self):
-        return f"{self.user} {self.type} {self.created_at:%Y-%m-%d %H:%M}"
\ No newline at end of file
+        return f"{self.user_id} — {self.suggested_id} #{self.rank}"
@@ -0,0 +1,22 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import inbox, live
+from .graph import bump_graph_version
+from .models import Follow
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(lambda: inbox.backfill(instance.follower_id, instance.followee_id))
+        bump_graph_version(instance.follower_id, instance.followee_id)
+        transaction.on_commit(lambda: live.follows_changed(instance.follower_id))
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    inbox.prune(instance.follower_id, instance.followee_id)
+    bump_graph_version(instance.follower_id, instance.followee_id)
+    transaction.on_commit(lambda: live.follows_changed(instance.follower_id))
@@ -1,3 +1,176 @@
+import datetime
+import io
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
 from django.test import TestCase
+from django.utils import timezone
+
+from diary.models import DiaryEntry
+from products.models import Product
+
+from .events import forget_entries, record_entries
+from .graph import follower_ids, following_ids
+from .inbox import fan_out
+from .models import Event, FeedItem, Follow
+from .people import build_people, people_for
+
+User = get_user_model()
+
+
+class FeedAuthorSearchTests(TestCase):
+    def setUp(self):
+        self.viewer = User.objects.create_user(email="viewer@example.com", password="p")
+        self.client.force_login(self.viewer)
+
+    def _event(self, author):
+        event = Event.objects.create(user=author, type="entry_created", payload={"product_ids": [], "date": "2026-01-01"})
+        fan_out([event.pk])
+        return event
+
+    def test_followed_author_below_global_top_matches(self):
+        # по всему сайту эти совпадения сильнее подписки — фильтр ленты не должен их учитывать
+        User.objects.bulk_create([
+            User(email=f"ivan{i}@example.com", first_name="Иван", last_name="Иванов", middle_name="Иванович",
+                 search_text=f"иванов иван иванович ivan{i}@example.com")
+            for i in range(1100)
+        ])
+        author = User.objects.create_user(email="petrov@example.com", password="p", first_name="Иван", last_name="Петров")
+        Follow.objects.create(follower=self.viewer, followee=author)
+        event = self._event(author)
+
+        response = self.client.get("/social/feed/", {"q": "иван"}, HTTP_HOST="localhost")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(f'data-event-id="{event.pk}"', response.content.decode())
+
+    def test_unmatched_author_filtered_out(self):
+        author = User.objects.create_user(email="petrov@example.com", password="p", first_name="Пётр")
+        Follow.objects.create(follower=self.viewer, followee=author)
+        event = self._event(author)
+
+        response = self.client.get("/social/feed/", {"q": "иван"}, HTTP_HOST="localhost")
+        self.assertNotIn(f'data-event-id="{event.pk}"', response.content.decode())
+
+
+class FollowGraphCacheTests(TestCase):
+    def setUp(self):
+        # кэш не откатывается вместе с БД, а id пользователей повторяются
+        cache.clear()
+
+    def test_follow_bumps_both_versions(self):
+        a = User.objects.create_user(email="a@example.com", password="p")
+        b = User.objects.create_user(email="b@example.com", password="p")
+        self.assertEqual(following_ids(a.pk), frozenset())
+        self.assertEqual(follower_ids(b.pk), frozenset())
+        with self.captureOnCommitCallbacks(execute=True):
+            Follow.objects.create(follower=a, followee=b)
+        self.assertEqual(following_ids(a.pk), {b.pk})
+        self.assertEqual(follower_ids(b.pk), {a.pk})
+
+
+class BuildPeopleTests(TestCase):
+    def test_friends_of_friends_stored_and_followed_hidden(self):
+        a, b, c = (User.objects.create_user(email=f"{n}@example.com", password="p") for n in "abc")
+        Follow.objects.create(follower=a, followee=b)
+        Follow.objects.create(follower=b, followee=c)
+
+        stats = build_people()
+        self.assertEqual(stats["users"], 2)
+        self.assertEqual([s.suggested for s in people_for(a.pk)], [c])
+
+        Follow.objects.create(follower=a, followee=c)
+        self.assertEqual(list(people_for(a.pk)), [])
+
+
+class UserSearchTests(TestCase):
+    def setUp(self):
+        self.viewer = User.objects.create_user(email="viewer@example.com", password="p")
+        self.client.force_login(self.viewer)
+
+    def test_people_suggestions_only_without_query(self):
+        with mock.patch("social.views.people_for", return_value=[]) as people:
+            self.client.get("/social/search/", {"q": "иван"}, HTTP_HOST="localhost")
+            people.assert_not_called()
+            self.client.get("/social/search/", HTTP_HOST="localhost")
+            people.assert_called_once_with(self.viewer.pk)
+
+
+class CompactEventPayloadsTests(TestCase):
+    def test_report_then_compact(self):
+        author = User.objects.create_user(email="compact@example.com", password="p")
+        apple = Product.objects.create(name="Яблоко", slug="compact-apple")
+        legacy = {"product_ids": [apple.pk], "date": "2026-01-01",
+                  "product_name": "Яблоко", "product_slug": "compact-apple", "kind": ""}
+        event = Event.objects.create(user=author, type="entry_created", payload=legacy)
+        orphan = Event.objects.create(user=author, type="entry_created", payload=dict(legacy, product_ids=[10**9]))
+
+        out = io.StringIO()
+        call_command("compact_event_payloads", "--report", stdout=out)
+        self.assertIn("Событий 2, можно сжать 1", out.getvalue())
+        event.refresh_from_db()
+        self.assertEqual(event.payload, legacy)
+
+        out = io.StringIO()
+        call_command("compact_event_payloads", stdout=out)
+        self.assertIn("Событий 2, сжато 1", out.getvalue())
+        self.assertIn("Таблица событий с индексами", out.getvalue())
+        event.refresh_from_db()
+        orphan.refresh_from_db()
+        self.assertEqual(event.payload, {"product_ids": [apple.pk], "date": "2026-01-01"})
+        self.assertIn("product_name", orphan.payload)
+
+
+class CoalesceEventsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(email="coalesce@example.com", password="p")
+        cls.follower = User.objects.create_user(email="coalesce-reader@example.com", password="p")
+        Follow.objects.create(follower=cls.follower, followee=cls.author)
+        cls.p = [Product.objects.create(name=f"Укр {i}", slug=f"coalesce-{i}") for i in range(6)]
+        cls.day = datetime.date(2026, 1, 1)
+
+    def _entries(self, *products):
+        return [DiaryEntry(user=self.author, product_id=p.pk, date=self.day) for p in products]
+
+    def _payloads(self):
+        return [e.payload["product_ids"] for e in Event.objects.filter(user=self.author).order_by("id")]
+
+    def test_merges_within_window(self):
+        a, b, c = self.p[:3]
+        new = record_entries(self.author.pk, self._entries(a))
+        self.assertEqual(len(new), 1)
+        self.assertEqual(record_entries(self.author.pk, self._entries(b, a, c)), [])
+        self.assertEqual(self._payloads(), [[a.pk, b.pk, c.pk]])
+
+    def test_new_event_after_window(self):
+        a, b = self.p[:2]
+        record_entries(self.author.pk, self._entries(a))
+        Event.objects.filter(user=self.author).update(
+            created_at=timezone.now() - datetime.timedelta(minutes=settings.FEED_COALESCE_MINUTES + 1))
+        self.assertEqual(len(record_entries(self.author.pk, self._entries(b))), 1)
+        self.assertEqual(self._payloads(), [[a.pk], [b.pk]])
+
+    def test_split_at_max_products(self):
+        with mock.patch("social.events.MAX_PRODUCTS", 2):
+            record_entries(self.author.pk, self._entries(*self.p[:3]))
+            record_entries(self.author.pk, self._entries(self.p[3]))
+            record_entries(self.author.pk, self._entries(*self.p[4:6]))
+        ids = [p.pk for p in self.p]
+        self.assertEqual(self._payloads(), [ids[0:2], ids[2:4], ids[4:6]])
+
+    def test_forget_one_then_last_product(self):
+        a, b = self.p[:2]
+        event, = record_entries(self.author.pk, self._entries(a, b))
+        fan_out([event.pk])
+        self.assertTrue(FeedItem.objects.filter(owner=self.follower, event=event).exists())
+
+        forget_entries(self._entries(a))
+        self.assertEqual(self._payloads(), [[b.pk]])
+        self.assertTrue(FeedItem.objects.filter(event=event).exists())
 
-# Create your tests here.
+        forget_entries(self._entries(b))
+        self.assertFalse(Event.objects.filter(pk=event.pk).exists())
+        self.assertFalse(FeedItem.objects.filter(event_id=event.pk).exists())
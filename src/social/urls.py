@@ -5,6 +5,8 @@ app_name = "social"
 
 urlpatterns = [
     path("feed/", views.feed, name="feed"),
+    path("feed/page/", views.feed_page, name="feed_page"),
+    path("feed/live/", views.feed_live, name="feed_live"),
     path("following/", views.following, name="following"),
     path("search/", views.user_search, name="search"),
     path("follow/<int:user_id>/", views.follow, name="follow"),
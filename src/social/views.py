@@ -1,10 +1,23 @@
+import asyncio
+from urllib.parse import urlencode
+
+from asgiref.sync import sync_to_async
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
-from django.db.models import Q
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.template.loader import render_to_string
 from django.contrib import messages
 
-from .models import Follow, Event
+from accounts.search import SEARCH_LIMIT, matching_user_ids, search_users
+from diary.services import aget_progress, request_user
+from products.pagination import keyset_page
+from . import live
+from .graph import following_ids
+from .hydration import hydrate
+from .models import FeedItem, Follow
+from .people import people_for
 
 User = get_user_model()
 
@@ -18,22 +31,16 @@ def user_search(request):
     q = (request.GET.get("q") or "").strip()
     users = User.objects.none()
     if q:
-        users = User.objects.filter(
-            Q(email__icontains=q) |
-            Q(first_name__icontains=q) |
-            Q(middle_name__icontains=q) |
-            Q(last_name__icontains=q)
-        ).exclude(id=request.user.id)[:200]
-
-    # кого я уже читаю — чтобы отрисовать кнопки
-    following_ids = set(
-        Follow.objects.filter(follower=request.user).values_list("followee_id", flat=True)
-    )
+        # по индексу нормализованного ФИО + e-mail, лучшие совпадения сверху
+        users = search_users(User.objects.exclude(id=request.user.id), q)[:SEARCH_LIMIT]
 
     ctx = {
         "q": q,
         "users": users,
-        "following_ids": following_ids,
+        # кого я уже читаю — чтобы отрисовать кнопки; из кэша графа подписок
+        "following_ids": following_ids(request.user.pk),
+        # подсказки людей — только на пустой странице поиска
+        "people": [] if q else people_for(request.user.pk),
     }
     return render(request, "social/search.html", ctx)
 
@@ -85,33 +92,105 @@ def unfollow(request, user_id: int):
     messages.info(request, f"Вы отписались от {target.email}.")
     return redirect(request.META.get("HTTP_REFERER") or "social:search")
 
+FEED_PER_PAGE = 30
+# порядок ленты и ключ курсора: новые сверху, event_id — различает одновременные
+FEED_KEY = ("-created_at", "-event_id")
+
+
+def _feed_items(user, flt, q):
+    # своя лента заполнена при создании событий (inbox.py) — проход по (owner, created_at)
+    qs = FeedItem.objects.filter(owner=user)
+    if flt == "subs":
+        qs = qs.exclude(author=user)
+
+    if q:
+        # в ленте только свои события и события подписок — среди них и ищем автора
+        qs = qs.filter(author_id__in=matching_user_ids(q, following_ids(user.pk) | {user.pk}))
+    return qs.select_related("event__user")
+
+
+def _feed_page(request, user):
+    q = (request.GET.get("q") or "").strip()
+    flt = (request.GET.get("filter") or "").strip()
+    page = keyset_page(_feed_items(user, flt, q), FEED_PER_PAGE,
+                       after=request.GET.get("after") or None, key=FEED_KEY)
+    # продукты событий — одним пакетным запросом на страницу
+    hydrate([item.event for item in page])
+    return page
+
+
+def _feed_ctx(request, page):
+    # параметры выборки без курсора — для ссылки «Показать ещё»
+    base_qs = urlencode([(k, v) for k, v in request.GET.items() if k != "after" and v])
+    return {
+        "events": [item.event for item in page],
+        "next_cursor": page.next_cursor if page.has_next() else "",
+        "base_qs": base_qs,
+    }
+
+
 @login_required
-def feed(request):
+async def feed(request):
     """
     Лента событий:
     - ?filter=subs — только события от тех, на кого я подписан
     - ?q=строка — поиск по email или ФИО пользователя
+    - ?after=курсор — следующая страница (без JS; с JS подгружает feed_page)
+    Асинхронная: страница событий, прогресс для виджета и подсказки людей
+    читаются, не блокируя цикл событий, но по очереди — в одном потоке sync_to_async.
     """
-    q = (request.GET.get("q") or "").strip()
-    flt = (request.GET.get("filter") or "").strip()
-
-    followees = Follow.objects.filter(follower=request.user).values_list("followee_id", flat=True)
-
-    if flt == "subs":
-        user_ids = list(followees)
-    else:
-        user_ids = list(followees) + [request.user.id]
+    user = await request_user(request)
+    page, request.diary_progress, people = await asyncio.gather(
+        sync_to_async(_feed_page)(request, user), aget_progress(user),
+        sync_to_async(list)(people_for(user.pk)),
+    )
+    ctx = dict(_feed_ctx(request, page), people=people)
+    return await sync_to_async(render)(request, "social/feed.html", ctx)
 
-    qs = Event.objects.filter(user_id__in=user_ids).select_related("user")
 
-    if q:
-        qs = qs.filter(
-            Q(user__email__icontains=q) |
-            Q(user__first_name__icontains=q) |
-            Q(user__last_name__icontains=q) |
-            Q(user__middle_name__icontains=q)
-        )
+@login_required
+def feed_page(request):
+    """
+    Следующая страница ленты для бесконечной прокрутки: GET с теми же
+    параметрами, что у feed, и ?after=курсор.
+    Ответ: {"html": фрагмент списка, "next": курсор или null, "events": [...]}.
+    """
+    page = _feed_page(request, request.user)
+    ctx = _feed_ctx(request, page)
+    return JsonResponse({
+        "html": render_to_string("social/feed_items.html", ctx, request=request),
+        "next": ctx["next_cursor"] or None,
+        "events": [
+            {
+                "id": e.pk,
+                "user": {"id": e.user_id, "name": e.user.get_full_name() or e.user.email},
+                "type": e.type,
+                "payload": e.payload,
+                "products": [p._asdict() for p in e.products],
+                "created_at": e.created_at.isoformat(),
+            }
+            for e in ctx["events"]
+        ],
+    })
 
-    events = qs.order_by("-created_at")[:100]
 
-    return render(request, "social/feed.html", {"events": events})
\ No newline at end of file
+@login_required
+async def feed_live(request):
+    """
+    Живая лента (Server-Sent Events, только под ASGI): новые события подписок
+    по мере раскладки, см. live.py. ?filter=subs — без своих событий.
+    """
+    if not isinstance(request, ASGIRequest):
+        # под WSGI открытая вкладка держала бы поток воркера; 204 — не переподключаться
+        return HttpResponse(status=204)
+    if live.is_full():
+        return HttpResponse(status=503, headers={"Retry-After": "30"})
+    user = await request_user(request)
+    response = StreamingHttpResponse(
+        live.stream(user.pk, own=request.GET.get("filter") != "subs"),
+        content_type="text/event-stream",
+    )
+    response["Cache-Control"] = "no-cache"
+    # nginx не должен буферизовать поток
+    response["X-Accel-Buffering"] = "no"
+    return response